@@ -13,8 +13,7 @@ Drivers made for this package can be found at https://github.com/autolab-project
 
 Visit https://autolab.readthedocs.io/ for the full documentation of this package.
 """
-import numpy  # OPTIMIZE: temporary fix to an infinite loading on some computer following the master merge (commit 25fd4d6)
-import socket  # OPTIMIZE: temporary fix to an infinite loading on some computer
+import importlib
 
 # Load current version in version file
 from .core.paths import PATHS, DRIVER_SOURCES
@@ -27,14 +26,9 @@ from .core import version_adapter
 version_adapter.process_all_changes()
 del version_adapter
 
-# Load user config
+# Load user config, once per process
 from .core import config as _config
-FIRST = _config.initialize_local_directory()
-_config.check_autolab_config()
-_config.check_plotter_config()
-_config.set_temp_folder()
-_config.add_extra_driver_path()
-_config.add_extra_driver_repo_url()
+FIRST = _config.initialize()
 
 # Add drivers folder to sys (allows a driver to import another driver)
 import sys
@@ -44,49 +38,77 @@ for folder in reversed(list(DRIVER_SOURCES.values())):
 del sys
 del folder
 
-# infos
-from .core.infos import infos, config_help
-from .core.infos import _list_devices as list_devices
-from .core.infos import _list_drivers as list_drivers
-
-# Devices
-from .core.devices import get_device, close, list_loaded_devices
-from .core import devices as _devices
-
 # Drivers
-from .core.drivers import get_driver, explore_driver
+from .core.drivers import get_driver, explore_driver, rescan_drivers
 from .core import drivers as _drivers
 
-# Webbrowser shortcuts
-from .core.web import report, doc
-
-# Server
-from .core.server import Server as server
-
-# GUI
-from .core.gui import (gui, plotter, monitor, slider, add_device, about,
-                       variables_menu, preferences, driver_installer)
-
-from .core.variables import get_variable, list_variables
-from .core.variables import set_variable as add_variable
-
 # Repository
 from .core.repository import install_drivers
 from .core import repository as _repository
 _repository._check_empty_driver_folder()
 
-del numpy
-del socket
-
-from .core._create_shortcut import create_shortcut
-
 if FIRST:
     # Ask if create shortcut
+    from .core._create_shortcut import create_shortcut
     create_shortcut(ask=True)
 del FIRST
 
 # Loading the drivers informations on startup
 _drivers.update_drivers_paths()
 
-# Used by os shell to start autolab
-from ._entry_script import main as _main
+# The other functions are imported on their first access (PEP 562), to not
+# import numpy, pandas, the server and the GUI with autolab.
+# name: (module, attribute in the module, None for the module itself)
+_LAZY_ATTRIBUTES = {
+    # infos
+    'infos': ('.core.infos', 'infos'),
+    'config_help': ('.core.infos', 'config_help'),
+    'list_devices': ('.core.infos', '_list_devices'),
+    'list_drivers': ('.core.infos', '_list_drivers'),
+    # Devices
+    'get_device': ('.core.devices', 'get_device'),
+    'get_devices': ('.core.devices', 'get_devices'),
+    'close': ('.core.devices', 'close'),
+    'list_loaded_devices': ('.core.devices', 'list_loaded_devices'),
+    '_devices': ('.core.devices', None),
+    # Webbrowser shortcuts
+    'report': ('.core.web', 'report'),
+    'doc': ('.core.web', 'doc'),
+    # Server
+    'server': ('.core.server', 'Server'),
+    # GUI
+    'gui': ('.core.gui', 'gui'),
+    'plotter': ('.core.gui', 'plotter'),
+    'monitor': ('.core.gui', 'monitor'),
+    'slider': ('.core.gui', 'slider'),
+    'add_device': ('.core.gui', 'add_device'),
+    'about': ('.core.gui', 'about'),
+    'variables_menu': ('.core.gui', 'variables_menu'),
+    'preferences': ('.core.gui', 'preferences'),
+    'driver_installer': ('.core.gui', 'driver_installer'),
+    # Variables
+    'get_variable': ('.core.variables', 'get_variable'),
+    'list_variables': ('.core.variables', 'list_variables'),
+    'add_variable': ('.core.variables', 'set_variable'),
+    # Shortcut
+    'create_shortcut': ('.core._create_shortcut', 'create_shortcut'),
+    # Used by os shell to start autolab
+    '_main': ('._entry_script', 'main'),
+}
+
+
+def __getattr__(name: str):
+    """ Imports the lazy attributes on their first access """
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = importlib.import_module(module_name, __name__)
+    if attribute is not None: value = getattr(value, attribute)
+    globals()[name] = value  # next accesses don't call __getattr__
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
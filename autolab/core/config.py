@@ -7,8 +7,10 @@ Created on Mon Nov 18 14:53:10 2019
 
 import os
 import tempfile
+import threading
 import configparser
-from typing import List
+from io import StringIO
+from typing import List, Tuple, Dict, Optional
 
 from .paths import PATHS, DRIVER_SOURCES, DRIVER_REPOSITORY
 from .utilities import boolean
@@ -18,6 +20,28 @@ from .utilities import boolean
 # GENERAL
 # =============================================================================
 
+_initialized = False
+
+
+def initialize() -> bool:
+    """ Initializes the local directory and the configuration files, and adds
+    the extra driver folders and repositories. Done once per process, the
+    next calls do nothing.
+    Returns True if create default autolab folder (first autolab use) """
+    global _initialized
+    if _initialized: return False
+    _initialized = True
+
+    FIRST = initialize_local_directory()
+    check_autolab_config()
+    check_plotter_config()
+    set_temp_folder()
+    add_extra_driver_path()
+    add_extra_driver_repo_url()
+
+    return FIRST
+
+
 def initialize_local_directory() -> bool:
     """ This function creates the default autolab local directory.
     Returns True if create default autolab folder (first autolab use) """
@@ -67,16 +91,50 @@ def initialize_local_directory() -> bool:
     return FIRST
 
 
+# Parsed config files, revalidated using the mtime and size of the file
+_config_cache: Dict[str, Tuple[Tuple[int, int], configparser.ConfigParser]] = {}
+_config_lock = threading.Lock()
+
+
 def save_config(config_name: str, config: configparser.ConfigParser):
-    """ This function saves the given config parser in the autolab configuration file """
+    """ This function saves the given config parser in the autolab configuration file.
+    The file is not written if its content doesn't change, which keeps the
+    parsed config cached """
+    text = StringIO()
+    config.write(text)
+    text = text.getvalue()
+
+    try:
+        with open(PATHS[config_name]) as file:
+            if file.read() == text: return None
+    except OSError:
+        pass
+
     with open(PATHS[config_name], 'w') as file:
-        config.write(file)
+        file.write(text)
+    clear_config_cache(config_name)
 
 
-def load_config(config_name: str) -> configparser.ConfigParser:
-    """ This function loads the autolab configuration file in a config parser """
+def clear_config_cache(config_name: Optional[str] = None):
+    """ Forces the next load of config_name (all configs if None) to parse
+    the configuration file again """
+    with _config_lock:
+        if config_name is None:
+            _config_cache.clear()
+        else:
+            _config_cache.pop(config_name, None)
+
+
+def _new_config() -> configparser.ConfigParser:
+    """ Returns an empty config parser with the autolab options """
     config = configparser.ConfigParser(allow_no_value=True, delimiters='=')  # don't want ':' as delim, needed for path as key
     config.optionxform = str
+    return config
+
+
+def _read_config(config_name: str) -> configparser.ConfigParser:
+    """ Parses the autolab configuration file in a new config parser """
+    config = _new_config()
     try:  # encoding order matter
         config.read(PATHS[config_name],
                     encoding='utf-8')
@@ -86,6 +144,47 @@ def load_config(config_name: str) -> configparser.ConfigParser:
     return config
 
 
+def _copy_config(config: configparser.ConfigParser) -> configparser.ConfigParser:
+    """ Returns an independent copy of config, much faster than parsing the
+    file again or than a deepcopy """
+    new_config = _new_config()
+    new_config._defaults.update(config._defaults)
+    for section, options in config._sections.items():
+        new_config._sections[section] = new_config._dict(options)
+        new_config._proxies[section] = configparser.SectionProxy(
+            new_config, section)
+
+    return new_config
+
+
+def _get_cached_config(config_name: str) -> configparser.ConfigParser:
+    """ Returns the config parser shared by all readers of config_name.
+    The file is only parsed again if its mtime or size changed.
+    The returned config must not be modified, use load_config for that """
+    try:
+        stat = os.stat(PATHS[config_name])
+    except OSError:
+        return _read_config(config_name)
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _config_lock:
+        cached = _config_cache.get(config_name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    config = _read_config(config_name)
+    with _config_lock:
+        _config_cache[config_name] = (key, config)
+
+    return config
+
+
+def load_config(config_name: str) -> configparser.ConfigParser:
+    """ This function loads the autolab configuration file in a config parser.
+    The returned config is a copy and can be modified """
+    return _copy_config(_get_cached_config(config_name))
+
+
 def modify_config(config_name: str, config_dict: dict) -> configparser.ConfigParser:
     """ Returns a modified config file structures using the input dict """
     config = load_config(config_name)
@@ -128,7 +227,11 @@ def modify_config(config_name: str, config_dict: dict) -> configparser.ConfigPar
 # =============================================================================
 
 autolab_dict = {
-    'server': {'port': 4001},
+    'server': {'port': 4001,
+               'max_age': 0.,
+               'lease_time': 10.,
+               'rate_limit': 1000.,
+               },
     'GUI': {'qt_api': "default",
             'theme': "default",
             'font_size': 10,
@@ -141,7 +244,8 @@ autolab_dict = {
                        'console': False,
                        },
     'monitor': {'precision': 4,
-                'save_figure': True},
+                'save_figure': True,
+                'frame_buffer': 100},
     'scanner': {'precision': 15,
                 'save_config': True,
                 'save_figure': True,
@@ -158,6 +262,7 @@ def change_autolab_config(config: configparser.ConfigParser):
     """ Save the autolab config file structures with comments """
     config.set('GUI', '# qt_api -> Choose between default, pyqt5, pyside2, pyqt6 and pyside6')
     config.set('GUI', '# theme -> Choose between default and dark')
+    config.set('server', '# max_age (s) -> Reads shared between clients, rate_limit -> commands per second per client')
     config.set('scanner', '# Think twice before using save_temp = False')
     config.set('extra_driver_path', r'# Example: onedrive = C:\Users\username\OneDrive\my_drivers')
     config.set('extra_driver_url_repo', r'# Example: C:\Users\username\OneDrive\my_drivers = https://github.com/my_repo/my_drivers')
@@ -217,7 +322,7 @@ def check_autolab_config():
 
 def get_config(section_name: str) -> configparser.SectionProxy:
     ''' Returns section from autolab_config.ini '''
-    config = load_config('autolab_config')
+    config = _get_cached_config('autolab_config')
     assert section_name in config.sections(), f'Missing {section_name} section in autolab_config.ini'
     return config[section_name]
 
@@ -346,21 +451,26 @@ def check_plotter_config():
 # DEVICES CONFIG
 # =============================================================================
 
-def get_all_devices_configs() -> configparser.ConfigParser:
-    ''' Returns current devices configuration '''
-    config = load_config('devices_config')
+def _check_devices_configs() -> configparser.ConfigParser:
+    ''' Returns the shared devices configuration, must not be modified '''
+    config = _get_cached_config('devices_config')
     assert len(set(config.sections())) == len(config.sections()), "Each device must have a unique name."
     return config
 
 
+def get_all_devices_configs() -> configparser.ConfigParser:
+    ''' Returns current devices configuration '''
+    return _copy_config(_check_devices_configs())
+
+
 def list_all_devices_configs() -> List[str]:
     ''' Returns the list of available configuration names '''
-    devices_configs = get_all_devices_configs()
+    devices_configs = _check_devices_configs()
     return sorted(list(devices_configs.sections()))
 
 
 def get_device_config(config_name) -> configparser.SectionProxy:
     ''' Returns the config associated with config_name '''
-    assert config_name in list_all_devices_configs(), f"Device configuration {config_name} not found"
-    devices_configs = get_all_devices_configs()
+    devices_configs = _check_devices_configs()
+    assert devices_configs.has_section(config_name), f"Device name '{config_name}' not found in devices_config.ini"
     return devices_configs[config_name]
@@ -5,7 +5,11 @@ Created on Thu Jun 13 10:25:49 2019
 @author: quentin.chateiller
 """
 
-from typing import List, Union
+import sys
+import time
+import bisect
+import threading
+from typing import List, Union, Dict, Tuple
 
 from .drivers import get_driver_path, get_driver
 from .config import list_all_devices_configs, get_device_config
@@ -14,9 +18,6 @@ from .elements import Module, Element
 # Storage of the devices
 DEVICES = {}
 
-# After DEVICES to avoid circular import
-from .variables import update_allowed_dict
-
 # =============================================================================
 # DEVICE CLASS
 # =============================================================================
@@ -27,32 +28,85 @@ class Device(Module):
         """ device_config is returned by :meth:`get_final_device_config` """
 
         self.device_config = device_config  # hidden from completion
-        self.driver_path = get_driver_path(device_config["driver"])
+        if device_config["driver"] == 'autolab_server':
+            self.driver_path = f'autolab server {instance.address}:{instance.port}'
+        else:
+            self.driver_path = get_driver_path(device_config["driver"])
 
         super().__init__(None, {'name': device_name, 'object': instance,
                                 'help': f'Device {device_name} at {self.driver_path}'})
 
+        # Built on the first get_element or list_addresses
+        self._elements = None
+        self._addresses = None
+
+    def _build_address_index(self):
+        """ Stores the sorted list of the addresses of the device elements, used
+        for completion. The elements are added to the index on their first
+        get_element, which builds their module if needed """
+        self._elements = {self.name: self}
+        self._addresses = sorted(
+            [self.name] + [address for address, _ in self._get_structure()])
+
+    def get_element(self, address: str) -> Element:
+        """ Returns the element of this device located at the provided
+        address <device.module.variable>, None if not found """
+        if self._addresses is None: self._build_address_index()
+        element = self._elements.get(address)
+        if element is None:
+            i = bisect.bisect_left(self._addresses, address)
+            if i == len(self._addresses) or self._addresses[i] != address:
+                return None
+            element = self
+            for name in address.split('.')[1: ]:
+                element = getattr(element, name, None)
+                # The index addresses are made of the attribute names
+                assert element is not None, f"Device {self.name}: address '{address}' of the index not found by attribute"
+            self._elements[address] = element
+        return element
+
+    def list_addresses(self, prefix: str = '') -> List[str]:
+        """ Returns the sorted list of the addresses of this device starting
+        with prefix, used for completion """
+        if self._addresses is None: self._build_address_index()
+        start = bisect.bisect_left(self._addresses, prefix)
+        end = bisect.bisect_left(self._addresses, prefix + '\U0010ffff', start)
+        return self._addresses[start: end]
+
     def close(self):
         """ This function close the connection of the current physical device """
         # Remove read and write signals from gui
         try:
             # condition avoid reopenning connection if use close twice
             if self.name in DEVICES:
-                for struc in self.get_structure():
-                    element = get_element_by_address(struc[0])
-                    if struc[1] == 'variable':
+                for element in self._iter_built_elements():
+                    if element._element_type == 'variable':
                         element._read_signal = None
                         element._write_signal = None
-                    if struc[1] == 'action':
+                    if element._element_type == 'action':
                         element._write_signal = None
         except: pass
 
-        try: self.instance.close()
+        try:
+            with self._io: self.instance.close()
         except: pass
 
+        self._elements = {}
+        self._addresses = []
+
         del DEVICES[self.name]
+        from .variables import update_allowed_dict  # circular import
         update_allowed_dict()
 
+    def _iter_built_elements(self):
+        """ Yields the variables and actions of the built modules """
+        modules = [self]
+        while modules:
+            module = modules.pop()
+            modules.extend(module._mod.values())
+            yield from module._var.values()
+            yield from module._act.values()
+
     def __dir__(self):
         """ For auto-completion """
         return (self.list_modules() + self.list_variables()
@@ -73,6 +127,12 @@ def get_element_by_address(address: str) -> Element:
         # This should not be used on autolab closing to avoid access violation due to config opening
         element = get_device(device_name)
 
+    if len(address_list) > 1:
+        sub_address = '.'.join(address_list[1: ]).replace(' ', '')
+        found = element.get_element(f'{device_name}.{sub_address}')
+        if found is not None: return found
+
+    # Not in the index, walk the hierarchy to get the error message
     for i, address_part in enumerate(address_list[1: ]):
         address_part = address_part.replace(' ', '')
         if hasattr(element, address_part):
@@ -85,8 +145,6 @@ def get_element_by_address(address: str) -> Element:
 
 def get_final_device_config(device_name: str, **kwargs) -> dict:
     ''' Returns a valid device config from configuration file overwritten by kwargs '''
-    assert device_name in list_all_devices_configs(), f"Device name '{device_name}' not found in devices_config.ini"
-
     # Load config object
     device_config = dict(get_device_config(device_name))
 
@@ -113,16 +171,131 @@ def get_device(device_name: str, **kwargs) -> Device:
         assert device_config == DEVICES[device_name].device_config, 'You cannot change the configuration of an existing Device. Close it first & retry, or remove the provided configuration.'
 
     else:
-        instance = get_driver(
-            device_config['driver'], device_config['connection'],
-            **{k: v for k, v in device_config.items() if k not in [
-                'driver', 'connection']})
-        DEVICES[device_name] = Device(device_name, instance, device_config)
+        DEVICES[device_name] = _load_device(device_name, device_config)
+        from .variables import update_allowed_dict  # circular import
         update_allowed_dict()
 
     return DEVICES[device_name]
 
 
+def _load_device(device_name: str, device_config: dict) -> Device:
+    """ Returns a new Device instance, not registered in DEVICES """
+    instance = get_driver(
+        device_config['driver'], device_config['connection'],
+        **{k: v for k, v in device_config.items() if k not in [
+            'driver', 'connection', 'max_age']})
+    try:
+        device = Device(device_name, instance, device_config)
+        # Read cache of all the device variables
+        if 'max_age' in device_config:
+            device.set_max_age(float(device_config['max_age']))
+        return device
+    except:
+        try: instance.close()
+        except: pass
+        raise
+
+
+def get_devices(device_names: List[str] = None, max_workers: int = 8,
+                timeout: float = None) -> Tuple[Dict[str, Device], Dict[str, Exception]]:
+    """ Loads several Devices concurrently, all the configured devices if
+    device_names is None. At most max_workers devices are loaded at the same
+    time, and a device taking more than timeout seconds to load is given up
+    (its connection is closed if it ends up loading).
+    The loaded devices are added to the loaded devices at once at the end.
+    Returns two dictionaries: the Devices and the errors of the devices that
+    failed to load, both with device names as keys. """
+    if device_names is None:
+        device_names = list_devices()
+    assert max_workers >= 1, f"max_workers must be at least 1, not {max_workers}"
+
+    devices = {}
+    errors = {}
+    configs = {}
+
+    for device_name in dict.fromkeys(device_names):  # remove duplicates
+        if device_name in DEVICES:
+            devices[device_name] = DEVICES[device_name]
+            continue
+        try:
+            configs[device_name] = get_final_device_config(device_name)
+        except Exception as e:
+            errors[device_name] = e
+
+    queue = list(configs)
+    running = {}  # device_name: start time
+    results = {}  # device_name: Device or Exception
+    abandoned = set()
+    condition = threading.Condition()
+
+    def load(device_name: str):
+        try:
+            result = _load_device(device_name, configs[device_name])
+        except Exception as e:
+            result = e
+
+        with condition:
+            if device_name not in abandoned:
+                results[device_name] = result
+                condition.notify()
+                return None
+
+        # Timeout already reported, close the late device
+        if isinstance(result, Device):
+            try: result.instance.close()
+            except: pass
+
+    with condition:
+        while queue or running:
+            while queue and len(running) < max_workers:
+                device_name = queue.pop(0)
+                running[device_name] = time.monotonic()
+                threading.Thread(target=load, args=(device_name, ), daemon=True,
+                                 name=f'autolab_device_{device_name}').start()
+
+            if timeout is None:
+                wait = None
+            else:
+                wait = max(min(running.values()) + timeout - time.monotonic(), 0)
+            if not any(device_name in results for device_name in running):
+                condition.wait(wait)
+
+            now = time.monotonic()
+            for device_name, start in list(running.items()):
+                if device_name in results:
+                    running.pop(device_name)
+                    result = results.pop(device_name)
+                    if isinstance(result, Exception):
+                        errors[device_name] = result
+                    else:
+                        devices[device_name] = result
+                elif timeout is not None and now - start >= timeout:
+                    running.pop(device_name)
+                    abandoned.add(device_name)
+                    errors[device_name] = TimeoutError(
+                        f"Device '{device_name}' not loaded after {timeout} s")
+
+    # Register the new devices at once
+    new_devices = {}
+    for device_name, device in devices.items():
+        if device_name not in DEVICES:
+            new_devices[device_name] = device
+        elif DEVICES[device_name] is not device:
+            # Loaded meanwhile by another thread, keep the registered one
+            try: device.instance.close()
+            except: pass
+            devices[device_name] = DEVICES[device_name]
+    if new_devices:
+        DEVICES.update(new_devices)
+        from .variables import update_allowed_dict  # circular import
+        update_allowed_dict()
+
+    for device_name, e in errors.items():
+        print(f"Can't load device '{device_name}': {e}", file=sys.stderr)
+
+    return devices, errors
+
+
 # =============================================================================
 # DEVICES LIST HELP
 # =============================================================================
@@ -6,9 +6,17 @@ Created on Tue Oct  1 17:38:15 2019
 """
 import os
 import sys
+import ast
+import json
+import hashlib
 import inspect
 import importlib
-from typing import Type, List, Tuple
+import importlib.abc
+import importlib.util
+import importlib.machinery
+import threading
+from contextlib import contextmanager
+from typing import Type, List, Tuple, Dict, Optional, Callable
 from types import ModuleType
 
 from .paths import PATHS, DRIVERS_PATHS, DRIVER_SOURCES
@@ -18,22 +26,57 @@ from .paths import PATHS, DRIVERS_PATHS, DRIVER_SOURCES
 # DRIVERS INSTANTIATION
 # =============================================================================
 
+# Drivers can be instantiated from several threads (see devices.get_devices):
+# the execution of driver scripts, which changes the working directory, is
+# serialized. Instead of adding the driver folders to sys.path, which would let
+# a driver import a same-named helper from the folder of a driver loaded at the
+# same time, each thread only imports from the folder of the driver it loads.
+_lib_lock = threading.RLock()
+
+
+class _DriverFolderFinder(importlib.abc.MetaPathFinder):
+    """ Finds the top-level modules in the driver folder set for the current
+    thread by _driver_folder, after the standard finders """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        folder = getattr(self._local, 'folder', None)
+        if folder is None or path is not None: return None
+        return importlib.machinery.PathFinder.find_spec(fullname, [folder])
+
+
+_driver_folder_finder = _DriverFolderFinder()
+sys.meta_path.append(_driver_folder_finder)
+
+
+@contextmanager
+def _driver_folder(path: str):
+    """ Allows the imports from the driver folder path in the current thread """
+    previous = getattr(_driver_folder_finder._local, 'folder', None)
+    _driver_folder_finder._local.folder = path
+    try:
+        yield
+    finally:
+        _driver_folder_finder._local.folder = previous
+
+
 def get_driver(driver_name: str, connection: str, **kwargs) -> Type:
     ''' Returns a driver instance using configuration provided in kwargs '''
     if driver_name == 'autolab_server':
-        from .server import Driver_REMOTE  # avoid circular import
-        driver_instance = Driver_REMOTE(**kwargs)
+        from .server import get_remote_driver  # avoid circular import
+        driver_instance = get_remote_driver(**kwargs)
     else:
-        assert driver_name in list_drivers(), f"Driver {driver_name} not found in autolab's drivers"
+        if driver_name not in DRIVERS_PATHS:
+            # Maybe a new driver. Rescan: a driver file added in an existing
+            # driver folder doesn't change the mtime of the source folder
+            update_drivers_paths(rescan=True)
+        assert driver_name in DRIVERS_PATHS, f"Driver {driver_name} not found in autolab's drivers"
         driver_lib = load_driver_lib(driver_name)
-        # Need to add the driver path to allow driver imports from its folder (and only his own, not other drivers)
-        driver_path = os.path.dirname(driver_lib.__file__)
-        if driver_path not in sys.path:
-            sys.path.append(driver_path)
-        try:
+        # Allow driver imports from its folder (and only his own, not other drivers)
+        with _driver_folder(os.path.dirname(driver_lib.__file__)):
             driver_instance = get_connection_class(driver_lib, connection)(**kwargs)
-        finally:
-            sys.path.remove(driver_path)
 
     return driver_instance
 
@@ -42,15 +85,9 @@ def load_driver_lib(driver_name: str) -> ModuleType:
     ''' Returns a driver library that contains Driver, Driver_XXX, Module_XXX '''
     # Loading preparation
     driver_path = get_driver_path(driver_name)
-    driver_directory = os.path.dirname(driver_path)
 
-    if driver_directory not in sys.path:
-        sys.path.append(driver_directory)
-    try:
-        # Load library
-        driver_lib = load_lib(driver_path)
-    finally:
-        sys.path.remove(driver_directory)
+    # Load library
+    driver_lib = load_lib(driver_path)
 
     return driver_lib
 
@@ -59,20 +96,22 @@ def load_lib(lib_path: str) -> ModuleType:
     ''' Returns an instance of the python script located at lib_path '''
     lib_name = os.path.basename(lib_path).split('.')[0]
 
-    # Save current working directory path
-    curr_dir = os.getcwd()
+    with _lib_lock:
+        # Save current working directory path
+        curr_dir = os.getcwd()
 
-    # Go to the driver's directory (in case it contains absolute imports)
-    os.chdir(os.path.dirname(lib_path))
+        # Go to the driver's directory (in case it contains absolute imports)
+        os.chdir(os.path.dirname(lib_path))
 
-    try:
-        # Load the module
-        spec = importlib.util.spec_from_file_location(lib_name, lib_path)
-        lib = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(lib)
-    finally:
-        # Come back to previous working directory
-        os.chdir(curr_dir)
+        try:
+            # Load the module, with imports from its folder
+            spec = importlib.util.spec_from_file_location(lib_name, lib_path)
+            lib = importlib.util.module_from_spec(spec)
+            with _driver_folder(os.path.dirname(lib_path)):
+                spec.loader.exec_module(lib)
+        finally:
+            # Come back to previous working directory
+            os.chdir(curr_dir)
 
     return lib
 
@@ -95,21 +134,24 @@ def load_utilities_lib(lib_path: str) -> ModuleType:
     ''' Returns an instance of the python script located at lib_path '''
     lib_name = os.path.basename(lib_path).split('.')[0]
 
-    # Save current working directory path
-    curr_dir = os.getcwd()
-
-    # Go to the driver's directory (in case it contains absolute imports)
-    os.chdir(os.path.dirname(lib_path))
+    with _lib_lock:
+        # Save current working directory path
+        curr_dir = os.getcwd()
 
-    # Load the module
-    lib_name = lib_name + '_utilities'
-    spec = importlib.util.spec_from_file_location(
-        lib_name, os.path.join(os.path.dirname(lib_path), f'{lib_name}.py'))
-    lib = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(lib)
+        # Go to the driver's directory (in case it contains absolute imports)
+        os.chdir(os.path.dirname(lib_path))
 
-    # Come back to previous working directory
-    os.chdir(curr_dir)
+        try:
+            # Load the module
+            lib_name = lib_name + '_utilities'
+            spec = importlib.util.spec_from_file_location(
+                lib_name, os.path.join(os.path.dirname(lib_path), f'{lib_name}.py'))
+            lib = importlib.util.module_from_spec(spec)
+            with _driver_folder(os.path.dirname(lib_path)):
+                spec.loader.exec_module(lib)
+        finally:
+            # Come back to previous working directory
+            os.chdir(curr_dir)
 
     return lib
 
@@ -120,7 +162,7 @@ def load_utilities_lib(lib_path: str) -> ModuleType:
 
 def list_drivers() -> List[str]:
     ''' Returns the list of available drivers '''
-    # To be sure that the list is up to date
+    # To be sure that the list is up to date, only list modified driver folders
     update_drivers_paths()
     return sorted(list(DRIVERS_PATHS))
 
@@ -147,6 +189,11 @@ def get_connection_names(driver_lib: ModuleType) -> List[str]:
 
 def get_driver_category(driver_name: str) -> str:
     ''' Returns the driver's category from class Driver '''
+    return get_driver_infos(driver_name)['category']
+
+
+def _load_driver_category(driver_name: str) -> str:
+    ''' Returns the driver's category by loading the driver library '''
     for filename in ('', '_utilities'):
 
         driver_utilities_path = os.path.join(
@@ -166,6 +213,20 @@ def get_driver_category(driver_name: str) -> str:
     return category
 
 
+def _read_driver_infos(driver_name: str) -> dict:
+    ''' Returns the category, connection names and module names of a driver
+    read from its metadata '''
+    try:
+        metadata = get_driver_metadata(driver_name)
+    except Exception as e:
+        print(f"Can't load {driver_name}: {e}", file=sys.stderr)
+        return {'category': 'Unknown', 'connections': [], 'modules': []}
+
+    return {'category': metadata['category'],
+            'connections': list(metadata['connections']),
+            'modules': list(metadata['modules'])}
+
+
 def get_driver_class(driver_lib: ModuleType) -> Type:
     ''' Returns the class Driver of the provided driver library '''
     assert hasattr(driver_lib, 'Driver'), f"Class Driver missing in driver {driver_lib.__name__}"
@@ -428,6 +489,240 @@ def get_class_args(clas: Type) -> dict:
         v.default is not inspect.Parameter.empty)}
 
 
+# =============================================================================
+# DRIVERS STATIC INSPECTION
+# =============================================================================
+# Driver informations read from the source code without executing it, to avoid
+# importing the instrument libraries of every driver.
+# The metadata are cached using the hash of the driver files.
+
+_driver_metadata_cache: Dict[str, dict] = {}
+_driver_metadata_lock = threading.Lock()
+
+
+def _read_node_value(node: ast.AST, source: str, constants: dict = None):
+    ''' Returns the value of a literal node or of a global constant,
+    or its source code if not a literal '''
+    if (constants is not None and isinstance(node, ast.Name)
+            and node.id in constants):
+        return constants[node.id]
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        if hasattr(ast, 'get_source_segment'):  # python >= 3.8
+            return ast.get_source_segment(source, node)
+        return None
+
+
+def _read_function_args(function: ast.FunctionDef, source: str,
+                        constants: dict = None) -> dict:
+    ''' Returns the dictionary of the optional arguments of a function with
+    their default values, like get_class_args '''
+    arguments = function.args
+    args = getattr(arguments, 'posonlyargs', []) + arguments.args
+    defaults = arguments.defaults
+    args_dict = {}
+    for arg, default in zip(args[len(args)-len(defaults):], defaults):
+        args_dict[arg.arg] = _read_node_value(default, source, constants)
+    for arg, default in zip(arguments.kwonlyargs, arguments.kw_defaults):
+        if default is not None:
+            args_dict[arg.arg] = _read_node_value(default, source, constants)
+
+    return args_dict
+
+
+def read_lib_metadata(source: str) -> dict:
+    ''' Returns the metadata of a python script read without executing it:
+    - category: value of the global variable category (None if not found)
+    - classes: {class_name: {'bases': [base names],
+                             'args': optional arguments of __init__ (None if no __init__),
+                             'attributes': class attributes with literal values}}
+    - imports: names imported by the global 'from ... import' statements
+    '''
+    tree = ast.parse(source)
+    metadata = {'category': None, 'classes': {}, 'imports': []}
+    constants = {}  # global variables with literal values
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            try:
+                value = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                continue
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = value
+                    if target.id == 'category':
+                        metadata['category'] = value
+
+        elif isinstance(node, ast.ImportFrom):
+            metadata['imports'].extend(alias.asname or alias.name
+                                       for alias in node.names)
+
+        elif isinstance(node, ast.ClassDef):
+            class_metadata = {
+                'bases': [base.id if isinstance(base, ast.Name) else base.attr
+                          for base in node.bases
+                          if isinstance(base, (ast.Name, ast.Attribute))],
+                'args': None, 'attributes': {}}
+
+            for sub_node in node.body:
+                if (isinstance(sub_node, ast.FunctionDef)
+                        and sub_node.name == '__init__'):
+                    class_metadata['args'] = _read_function_args(
+                        sub_node, source, constants)
+                elif isinstance(sub_node, ast.Assign):
+                    for target in sub_node.targets:
+                        if isinstance(target, ast.Name):
+                            class_metadata['attributes'][target.id] = _read_node_value(
+                                sub_node.value, source, constants)
+                elif (isinstance(sub_node, ast.AnnAssign)
+                        and isinstance(sub_node.target, ast.Name)
+                        and sub_node.value is not None):
+                    class_metadata['attributes'][sub_node.target.id] = _read_node_value(
+                        sub_node.value, source, constants)
+
+            metadata['classes'][node.name] = class_metadata
+
+    return metadata
+
+
+def _get_static_class_member(classes: dict, class_name: str, get: Callable):
+    ''' Returns get(class metadata) for the class or, if None, for its parent
+    classes (following the first base). Raises LookupError if the member may be
+    inherited from a class not defined in the same script '''
+    visited = []
+    while class_name not in visited:
+        if class_name not in classes: raise LookupError(class_name)
+        visited.append(class_name)
+        value = get(classes[class_name])
+        if value is not None: return value
+        bases = [base for base in classes[class_name]['bases'] if base != 'object']
+        if len(bases) == 0: break
+        class_name = bases[0]
+
+    return None
+
+
+def _get_static_class_args(classes: dict, class_name: str) -> dict:
+    ''' Returns the optional arguments of the class __init__, looking in the
+    parent classes if not overwritten '''
+    args = _get_static_class_member(classes, class_name, lambda c: c['args'])
+    return {} if args is None else dict(args)
+
+
+def _get_driver_static_metadata(driver_name: str, sources: List[str]) -> Optional[dict]:
+    ''' Returns the driver metadata read from the source code of the driver
+    and of its utilities, None if the classes of the driver are not all defined
+    in the driver '''
+    try:
+        driver_metadata = read_lib_metadata(sources[0])
+    except (SyntaxError, ValueError) as e:
+        print(f"Can't read {driver_name}: {e}", file=sys.stderr)
+        return None
+
+    classes = driver_metadata['classes']
+    if 'Driver' not in classes: return None
+
+    # Classes imported from another script (like the driver utilities), or
+    # inheriting from them, are only known by loading the driver
+    for name in driver_metadata['imports']:
+        if name == '*' or name == 'Driver' or name.startswith(('Driver_', 'Module_')):
+            return None
+
+    category = driver_metadata['category']
+    if category is None and sources[1] is not None:
+        try:
+            category = read_lib_metadata(sources[1])['category']
+        except (SyntaxError, ValueError) as e:
+            print(f"Can't read {driver_name}_utilities: {e}", file=sys.stderr)
+
+    slot_config = classes['Driver']['attributes'].get('slot_config')
+
+    try:
+        metadata = {
+            'category': 'Unknown' if category is None else category,
+            'connections': {
+                name.split('_')[1]: _get_static_class_args(classes, name)
+                for name in sorted(classes) if name.startswith('Driver_')},
+            'driver_args': _get_static_class_args(classes, 'Driver'),
+            'slot_config': None if slot_config is None else f'{slot_config}',
+            'modules': {
+                name.split('_')[1]: _get_static_class_member(
+                    classes, name, lambda c: c['attributes'].get('category'))
+                for name in sorted(classes) if name.startswith('Module_')},
+            }
+    except LookupError:  # inherited from a class of another script
+        return None
+
+    return metadata
+
+
+def _get_driver_loaded_metadata(driver_name: str) -> dict:
+    ''' Returns the driver metadata by loading the driver library, used if the
+    classes of the driver can't be read from the source code '''
+    driver_lib = load_driver_lib(driver_name)
+    driver_class = get_driver_class(driver_lib)
+    slot_config = getattr(driver_class, 'slot_config', None)
+
+    metadata = {
+        'category': _load_driver_category(driver_name),
+        'connections': {
+            conn: get_class_args(get_connection_class(driver_lib, conn))
+            for conn in get_connection_names(driver_lib)},
+        'driver_args': get_class_args(driver_class),
+        'slot_config': None if slot_config is None else f'{slot_config}',
+        'modules': {
+            module: getattr(get_module_class(driver_lib, module), 'category', None)
+            for module in get_module_names(driver_lib)},
+        }
+
+    return metadata
+
+
+def get_driver_metadata(driver_name: str) -> dict:
+    ''' Returns the informations of a driver without executing it if possible:
+    - category: category of the driver ('Unknown' if not found)
+    - connections: {connection name: optional arguments of Driver_XXX}
+    - driver_args: optional arguments of Driver
+    - slot_config: slot_config of Driver (None if not found)
+    - modules: {module name: category of Module_XXX (None if not found)}
+    The metadata are cached using the hash of the driver files.
+    The returned dictionary must not be modified.
+    '''
+    driver_path = get_driver_path(driver_name)
+    utilities_path = os.path.join(os.path.dirname(driver_path),
+                                  f'{driver_name}_utilities.py')
+    sources = []
+    driver_hash = hashlib.blake2b(digest_size=16)
+    for path in (driver_path, utilities_path):
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+        except OSError:
+            sources.append(None)
+            driver_hash.update(b'\x00')
+        else:
+            sources.append(content.decode('utf-8', errors='replace'))
+            driver_hash.update(hashlib.blake2b(content, digest_size=16).digest())
+    assert sources[0] is not None, f"Can't read driver {driver_name} at {driver_path}"
+
+    key = driver_hash.hexdigest()
+    with _driver_metadata_lock:
+        metadata = _driver_metadata_cache.get(key)
+    if metadata is not None:
+        return metadata
+
+    metadata = _get_driver_static_metadata(driver_name, sources)
+    if metadata is None:
+        metadata = _get_driver_loaded_metadata(driver_name)
+
+    with _driver_metadata_lock:
+        _driver_metadata_cache[key] = metadata
+
+    return metadata
+
+
 # =============================================================================
 # DRIVERS PATHS
 # =============================================================================
@@ -435,36 +730,164 @@ def get_class_args(clas: Type) -> dict:
 def get_driver_path(driver_name: str) -> str:
     ''' Returns the config associated with driver_name '''
     assert isinstance(driver_name, str), "drive_name must be a string."
-    assert driver_name in DRIVERS_PATHS, f'Driver {driver_name} not found.'
-    return DRIVERS_PATHS[driver_name]['path']
+    driver_paths = DRIVERS_PATHS.get(driver_name)  # single lookup, may be rescanned
+    assert driver_paths is not None, f'Driver {driver_name} not found.'
+    return driver_paths['path']
+
+
+# =============================================================================
+# DRIVERS INDEX
+# =============================================================================
+# The drivers found in each driver folder and their informations are stored in
+# PATHS['drivers_index'] to avoid listing every driver folder and loading every
+# driver at each start:
+# - sources: {source_path: {'mtime': mtime of the folder, 'drivers': {driver_name: driver_path}}}
+# - infos: {driver_path: {'mtimes': mtimes of the driver files, 'category': str,
+#                         'connections': [str], 'modules': [str]}}
+
+DRIVERS_INDEX_VERSION = 1
 
+_drivers_index = None
+_drivers_index_lock = threading.RLock()
 
-def load_drivers_paths() -> dict:
+
+def _get_mtime(path: str) -> Optional[int]:
+    ''' Returns the modification time of path in ns, None if doesn't exist '''
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _get_drivers_index() -> dict:
+    ''' Returns the drivers index, loaded from the user folder the first time '''
+    global _drivers_index
+    with _drivers_index_lock:
+        if _drivers_index is None:
+            _drivers_index = {'version': DRIVERS_INDEX_VERSION,
+                              'sources': {}, 'infos': {}}
+            try:
+                with open(PATHS['drivers_index'], 'r', encoding='utf-8') as file:
+                    index = json.load(file)
+            except (OSError, ValueError):
+                pass  # No index or corrupted index, will be recreated
+            else:
+                if (isinstance(index, dict)
+                        and index.get('version') == DRIVERS_INDEX_VERSION):
+                    _drivers_index.update(index)
+
+        return _drivers_index
+
+
+def _save_drivers_index():
+    ''' Writes the drivers index in the user folder '''
+    with _drivers_index_lock:
+        index = _get_drivers_index()
+        temp_path = PATHS['drivers_index'] + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(index, file)
+            os.replace(temp_path, PATHS['drivers_index'])
+        except OSError as e:  # Index only used to speed up, not critical
+            print(f"Warning, can't save drivers index: {e}", file=sys.stderr)
+
+
+def _scan_driver_source(source_path: str) -> Dict[str, str]:
     ''' Returns a dictionary with:
         - key: name of the driver
         - value: path of the driver python script
+    found in the driver folder source_path
     '''
     drivers_paths = {}
-    for source_name, source_path in DRIVER_SOURCES.items():
-        if not os.path.isdir(source_path):
-            print(f"Warning, can't found driver folder: {source_path}")
-            continue
-        for driver_name in os.listdir(source_path):
-            temp_path = os.path.join(source_path, driver_name)
-            if (os.path.isdir(temp_path)
-                    and f'{driver_name}.py' in os.listdir(temp_path)):
-                ## Before, raised error if two identical drivers in different folders, I thought of putting a warning message instead but there was too much printing, now don't say that overwrite path (don't overwrite file).
-                # if driver_name in drivers_paths.keys():
-                #     print(f"Two drivers where found with the name '{driver_name}', will use path {source_name}")
-                # assert driver_name not in drivers_paths.keys(), f"Two drivers where found with the name '{driver_name}'. Each driver must have a unique name."
-                drivers_paths[driver_name] = {
-                    'path': os.path.join(temp_path, f'{driver_name}.py'),
-                    'source': source_name}
+    for driver_name in os.listdir(source_path):
+        driver_path = os.path.join(source_path, driver_name, f'{driver_name}.py')
+        if os.path.isfile(driver_path):
+            drivers_paths[driver_name] = driver_path
 
     return drivers_paths
 
 
-def update_drivers_paths():
-    ''' Update list of available driver '''
-    DRIVERS_PATHS.clear()
-    DRIVERS_PATHS.update(load_drivers_paths())
+def update_drivers_paths(rescan: bool = False):
+    ''' Update list of available driver. Only the driver folders modified
+    since the last update are listed again, unless rescan is True '''
+    with _drivers_index_lock:
+        index = _get_drivers_index()
+        changed = False
+        drivers_paths = {}
+
+        for source_name, source_path in DRIVER_SOURCES.items():
+            mtime = _get_mtime(source_path)
+            if mtime is None or not os.path.isdir(source_path):
+                print(f"Warning, can't found driver folder: {source_path}")
+                continue
+
+            source = index['sources'].get(source_path)
+            if rescan or source is None or source['mtime'] != mtime:
+                source = {'mtime': mtime,
+                          'drivers': _scan_driver_source(source_path)}
+                index['sources'][source_path] = source
+                changed = True
+
+            ## Before, raised error if two identical drivers in different folders, now the last source overwrite the previous ones.
+            for driver_name, driver_path in source['drivers'].items():
+                drivers_paths[driver_name] = {'path': driver_path,
+                                              'source': source_name}
+
+        # Updated in place, read without lock by get_driver in other threads
+        DRIVERS_PATHS.update(drivers_paths)
+        for driver_name in [name for name in DRIVERS_PATHS if name not in drivers_paths]:
+            DRIVERS_PATHS.pop(driver_name, None)
+
+        if changed:
+            # Remove the folders and drivers that no longer exist
+            source_paths = list(DRIVER_SOURCES.values())
+            for source_path in list(index['sources']):
+                if source_path not in source_paths:
+                    index['sources'].pop(source_path)
+            driver_paths = [val['path'] for val in DRIVERS_PATHS.values()]
+            for driver_path in list(index['infos']):
+                if driver_path not in driver_paths:
+                    index['infos'].pop(driver_path)
+            _save_drivers_index()
+
+
+def rescan_drivers() -> List[str]:
+    ''' Lists again all the driver folders, even if not modified.
+    Returns the list of available drivers '''
+    update_drivers_paths(rescan=True)
+    return sorted(list(DRIVERS_PATHS))
+
+
+def get_drivers_infos(drivers_names: List[str]) -> Dict[str, dict]:
+    ''' Returns the category, connection names and module names of each driver.
+    Read from the drivers index, the driver is only loaded if modified '''
+    drivers_infos = {}
+    changed = False
+
+    for driver_name in drivers_names:
+        driver_path = get_driver_path(driver_name)
+        utilities_path = os.path.join(os.path.dirname(driver_path),
+                                      f'{driver_name}_utilities.py')
+        mtimes = [_get_mtime(driver_path), _get_mtime(utilities_path)]
+
+        with _drivers_index_lock:
+            infos = _get_drivers_index()['infos'].get(driver_path)
+
+        if infos is None or infos['mtimes'] != mtimes:
+            infos = _read_driver_infos(driver_name)
+            infos['mtimes'] = mtimes
+            with _drivers_index_lock:
+                _get_drivers_index()['infos'][driver_path] = infos
+            changed = True
+
+        drivers_infos[driver_name] = infos
+
+    if changed:
+        _save_drivers_index()
+
+    return drivers_infos
+
+
+def get_driver_infos(driver_name: str) -> dict:
+    ''' Returns the category, connection names and module names of a driver '''
+    return get_drivers_infos([driver_name])[driver_name]
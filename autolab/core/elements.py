@@ -7,18 +7,23 @@ Created on Fri Oct 18 22:20:14 2019
 
 import os
 import sys
+import time
 import inspect
-from typing import Type, Tuple, List, Any
+import threading
+from typing import Type, Tuple, List, Any, Optional
 
 import numpy as np
 import pandas as pd
 
 from .paths import PATHS
 from .utilities import emphasize, clean_string, SUPPORTED_EXTENSION
+from .io_scheduler import DeviceIOScheduler
 
 
 class Element():
 
+    __slots__ = ('name', '_element_type', '_parent', '_help', '__weakref__')
+
     def __init__(self, parent: Type, element_type: str, name: str):
 
         self.name = name
@@ -34,8 +39,26 @@ class Element():
         return self.name
 
 
+class _PendingRead():
+    """ Read of a Variable in progress, shared by the concurrent readers """
+
+    __slots__ = ('event', 'generation', 'answer', 'error')
+
+    def __init__(self, generation: int):
+        self.event = threading.Event()
+        self.generation = generation
+        self.answer = None
+        self.error = None
+
+
 class Variable(Element):
 
+    __slots__ = ('type', 'value', 'read_function', 'read_init', 'write_function',
+                 'unit', 'writable', 'readable', 'numerical',
+                 'parameter_allowed', '_read_signal_obj', '_write_signal_obj',
+                 'fast_read', 'fast_write', 'max_age', '_cache',
+                 '_cache_lock', '_cache_generation', '_pending_read')
+
     def __init__(self, parent: Type, config: dict):
 
         super().__init__(parent, 'variable', config['name'])
@@ -78,6 +101,16 @@ class Variable(Element):
             assert isinstance(config['help'], str), f"Variable {self.address()} configuration: Info parameter must be a string"
             self._help = config['help']
 
+        # Read cache
+        self.max_age = None
+        self._cache = None  # (time of the read, value)
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0  # incremented on each write
+        self._pending_read = None
+        if 'max_age' in config:
+            assert isinstance(config['max_age'], (int, float)) and config['max_age'] >= 0, f"Variable {self.address()} configuration: max_age parameter must be a positive number"
+            self.max_age = float(config['max_age'])
+
         # Properties
         self.writable = self.write_function is not None
         self.readable = self.read_function is not None
@@ -85,8 +118,172 @@ class Variable(Element):
         self.parameter_allowed = self.writable and self.numerical
 
         # Signals for GUI
-        self._read_signal = None
-        self._write_signal = None
+        self._read_signal_obj = None
+        self._write_signal_obj = None
+
+        self._build_fast_functions()
+
+    @property
+    def _read_signal(self):
+        return self._read_signal_obj
+
+    @_read_signal.setter
+    def _read_signal(self, signal):
+        self._read_signal_obj = signal
+        self._build_fast_functions()
+
+    @property
+    def _write_signal(self):
+        return self._write_signal_obj
+
+    @_write_signal.setter
+    def _write_signal(self, signal):
+        self._write_signal_obj = signal
+        self._build_fast_functions()
+
+    def _build_fast_functions(self):
+        """ Builds fast_read and fast_write, the read and write functions
+        specialized for the type of the variable and the GUI signals connected.
+        They skip the checks of __call__ and are rebuilt when a signal changes """
+        self.fast_read = self._build_fast_read()
+        self.fast_write = self._build_fast_write()
+
+    def _build_fast_read(self):
+        """ Returns the function used to read the variable """
+        if not self.readable:
+            address = self.address()
+            def fast_read():
+                raise AssertionError(f"The variable {address} is not readable")
+            return fast_read
+
+        read_function = self._parent._io.guard(self.read_function)
+        if self.max_age is not None:
+            read_function = self._build_cached_read(read_function, self.max_age)
+        signal = self._read_signal_obj
+        store_value = self.type in [tuple]  # OPTIMIZE: could be generalized to any variable but fear could lead to memory issue
+
+        if signal is None and not store_value:
+            return read_function
+
+        def fast_read():
+            answer = read_function()
+            if signal is not None: signal.emit_read(answer)
+            if store_value: self.value = answer
+            return answer
+
+        return fast_read
+
+    def _build_fast_write(self):
+        """ Returns the function used to set the variable """
+        if not self.writable:
+            address = self.address()
+            def fast_write(value: Any):
+                raise AssertionError(f"The variable {address} is not writable")
+            return fast_write
+
+        guarded_write_function = self._parent._io.guard(self.write_function)
+        if self.max_age is not None:
+            def write_function(value: Any):
+                try:
+                    guarded_write_function(value)
+                finally:
+                    self.clear_cache()
+        else:
+            write_function = guarded_write_function
+        signal = self._write_signal_obj
+        store_value = self.type in [tuple]
+        variable_type = self.type
+
+        if variable_type is np.ndarray:
+            def convert(value: Any) -> np.ndarray:
+                return np.array(value, ndmin=1)  # ndim=1 to avoid having float if 0D
+        else:
+            def convert(value: Any) -> Any:
+                if isinstance(value, np.ndarray):
+                    return np.array(value, ndmin=1)
+                return variable_type(value)
+
+        if signal is None and not store_value:
+            if variable_type is np.ndarray:
+                def fast_write(value: Any):
+                    write_function(np.array(value, ndmin=1))
+            else:
+                def fast_write(value: Any):
+                    if isinstance(value, np.ndarray):
+                        write_function(np.array(value, ndmin=1))
+                    else:
+                        write_function(variable_type(value))
+            return fast_write
+
+        def fast_write(value: Any):
+            value = convert(value)
+            if store_value: self.value = value
+            write_function(value)
+            if signal is not None: signal.emit_write(value)
+
+        return fast_write
+
+    def _build_cached_read(self, read_function, max_age: float):
+        """ Returns a read function that returns the last value read if not
+        older than max_age (in s). The readers calling it during a read wait
+        for its answer instead of reading the device again """
+        lock = self._cache_lock
+
+        def cached_read():
+            cache = self._cache
+            if cache is not None and time.monotonic() - cache[0] <= max_age:
+                return cache[1]
+
+            with lock:
+                pending = self._pending_read
+                leader = pending is None
+                if leader:
+                    pending = _PendingRead(self._cache_generation)
+                    self._pending_read = pending
+
+            if not leader:
+                pending.event.wait()
+                if pending.error is not None: raise pending.error
+                return pending.answer
+
+            start = time.monotonic()
+            try:
+                pending.answer = read_function()
+            except BaseException as e:
+                pending.error = e
+                raise
+            finally:
+                with lock:
+                    if self._pending_read is pending:
+                        self._pending_read = None
+                    # Don't keep a value read before a write
+                    if (pending.error is None
+                            and pending.generation == self._cache_generation):
+                        self._cache = (start, pending.answer)
+                pending.event.set()
+
+            return pending.answer
+
+        return cached_read
+
+    def set_max_age(self, max_age: Optional[float]):
+        """ Enables the read cache: a read returns the last value read if not
+        older than max_age (in s), and concurrent reads share the same
+        device read. max_age=0 only shares concurrent reads.
+        max_age=None disables the cache """
+        if max_age is not None:
+            assert max_age >= 0, f"Variable {self.address()}: max_age must be positive"
+            max_age = float(max_age)
+        self.max_age = max_age
+        self.clear_cache()
+        self._build_fast_functions()
+
+    def clear_cache(self):
+        """ Forgets the last value read, the next read will read the device """
+        with self._cache_lock:
+            self._cache = None
+            self._pending_read = None
+            self._cache_generation += 1
 
     def save(self, path: str, value: Any = None):
         """ This function measure the variable and saves its value in the provided path """
@@ -138,6 +335,8 @@ class Variable(Element):
         if self.unit is not None: display += f'{self.unit}\n'
         else: display += 'None\n'
 
+        if self.max_age is not None: display += f'Read cache: {self.max_age} s\n'
+
         return display
 
     def __call__(self, value: Any = None) -> Any:
@@ -145,28 +344,19 @@ class Variable(Element):
         # GET FUNCTION
         if value is None:
             assert self.readable, f"The variable {self.address()} is not readable"
-            answer = self.read_function()
-            if self._read_signal is not None: self._read_signal.emit_read(answer)
-            if self.type in [tuple]:  # OPTIMIZE: could be generalized to any variable but fear could lead to memory issue
-                self.value = answer
-            return answer
+            return self.fast_read()
 
         # SET FUNCTION
         assert self.writable, f"The variable {self.address()} is not writable"
-
-        if isinstance(value, np.ndarray) or self.type in [np.ndarray]:
-            value = np.array(value, ndmin=1)  # ndim=1 to avoid having float if 0D
-        else:
-            value = self.type(value)
-        if self.type in [tuple]:  # OPTIMIZE: could be generalized to any variable but fear could lead to memory issue
-            self.value = value
-        self.write_function(value)
-        if self._write_signal is not None: self._write_signal.emit_write(value)
+        self.fast_write(value)
         return None
 
 
 class Action(Element):
 
+    __slots__ = ('function', 'type', 'unit', 'has_parameter', 'value',
+                 '_write_signal')
+
     def __init__(self, parent: Type, config: dict):
 
         super().__init__(parent, 'action', config['name'])
@@ -230,7 +420,7 @@ class Action(Element):
                     value = np.array(value, ndmin=1)  # ndim=1 to avoid having float if 0D
                 else:
                     value = self.type(value)
-                self.function(value)
+                with self._parent._io: self.function(value)
             elif self.unit in ('open-file', 'save-file', 'filename'):
                 if self.unit == 'filename':  # LEGACY (may be removed later)
                     print(f"Using 'filename' as unit is depreciated in favor of 'open-file' and 'save-file'" \
@@ -256,7 +446,7 @@ class Action(Element):
                     path = os.path.dirname(filename)
                     PATHS['last_folder'] = path
                     value = filename
-                    self.function(value)
+                    with self._parent._io: self.function(value)
                 else:
                     print(f"Action '{self.address()}' cancel filename selection")
 
@@ -271,28 +461,68 @@ class Action(Element):
 
                 if response != '':
                     value = response
-                    self.function(value)
+                    with self._parent._io: self.function(value)
             else:
                 assert value is not None, f"The action {self.address()} requires an argument"
         else:
             assert value is None, f"The action {self.address()} doesn't require an argument"
-            self.function()
+            with self._parent._io: self.function()
 
         if self.type in [tuple]:  # OPTIMIZE: could be generalized to any variable but fear could lead to memory issue
             self.value = value
         if self._write_signal is not None: self._write_signal.emit_write(value)
 
 
+# Module.set_max_age not called
+_NOT_SET = object()
+
+
+def _attribute_address(element: Element) -> str:
+    """ Returns the address of element made of the names of the attributes
+    giving access to it (names cleaned with clean_string), used as keys of
+    the module structures """
+    if element._parent is None: return element.name
+    return _attribute_address(element._parent) + '.' + clean_string(element.name)
+
+
+def _get_model_structure(address: str, instance) -> List[Tuple[str, str]]:
+    """ Returns the structure of a module (see Module._get_structure) from the
+    driver model of its instance, without building it """
+    structure = [(address, 'module')]
+    variables = []
+    actions = []
+
+    for config_line in instance.get_driver_model():
+        element_address = f"{address}.{clean_string(config_line['name'])}"
+        if config_line['element'] == 'module':
+            structure += _get_model_structure(element_address, config_line['object'])
+        elif config_line['element'] == 'variable':
+            variables.append((element_address, 'variable'))
+        elif config_line['element'] == 'action':
+            actions.append((element_address, 'action'))
+
+    return structure + variables + actions
+
+
 class Module(Element):
 
+    __slots__ = ('_mod', '_mod_configs', '_var', '_act', '_read_init_list',
+                 'instance', '_io', '_structure', '_max_age')
+
     def __init__(self, parent: Type, config: dict):
 
         super().__init__(parent, 'module', config['name'])
 
-        self._mod = {}
+        self._mod = {}  # built submodules
+        self._mod_configs = {}  # all submodules, built on first access
         self._var = {}
         self._act = {}
         self._read_init_list = []
+        self._structure = None
+        self._max_age = _NOT_SET
+
+        # Calls to the driver are serialized by device
+        self._io = DeviceIOScheduler() if parent is None else parent._io
 
         # Object - instance
         assert 'object' in config, f"Module {self.address()}: missing module object"
@@ -326,33 +556,51 @@ class Module(Element):
 
             if element_type == 'module':
                 # Check name uniqueness
-                assert name not in self.get_names(), f"Module {self.address()}, Submodule {name} configuration: '{name}' already exists"
-                self._mod[name] = Module(self, config_line)
+                assert not self._has_name(name), f"Module {self.address()}, Submodule {name} configuration: '{name}' already exists"
+                assert 'object' in config_line, f"Module {self.address()}, Submodule {name} configuration: missing module object"
+                # Built on first access (see get_module)
+                self._mod_configs[name] = config_line
 
             elif element_type == 'variable':
                 # Check name uniqueness
-                assert name not in self.get_names(), f"Module {self.address()}, Variable {name} configuration: '{name}' already exists"
+                assert not self._has_name(name), f"Module {self.address()}, Variable {name} configuration: '{name}' already exists"
                 self._var[name] = Variable(self, config_line)
                 if self._var[name].read_init:
                     self._read_init_list.append(self._var[name])
 
             elif element_type == 'action':
                 # Check name uniqueness
-                assert name not in self.get_names(), f"Module {self.address()}, Action {name} configuration: '{name}' already exists"
+                assert not self._has_name(name), f"Module {self.address()}, Action {name} configuration: '{name}' already exists"
                 self._act[name] = Action(self, config_line)
 
     def get_module(self, name: str) -> Type:  # -> Module
-        """ Returns the submodule of the given name """
-        assert name in self.list_modules(), f"The submodule '{name}' does not exist in module {self.address()}"
-        return self._mod[name]
+        """ Returns the submodule of the given name, built on first call """
+        module = self._mod.get(name)
+        if module is not None: return module
+
+        assert name in self._mod_configs, f"The submodule '{name}' does not exist in module {self.address()}"
+        with self._io:  # also prevents a concurrent build
+            module = self._mod.get(name)
+            if module is None:
+                module = Module(self, self._mod_configs[name])
+                if self._max_age is not _NOT_SET:
+                    module.set_max_age(self._max_age)
+                self._mod[name] = module
+        return module
 
     def list_modules(self) -> List[str]:
         """ Returns a list with the names of all existing submodules """
-        return list(self._mod)
+        return list(self._mod_configs)
+
+    def preload(self):
+        """ Builds all the submodules of this module, recursively.
+        Otherwise a submodule is built on its first access """
+        for name in self._mod_configs:
+            self.get_module(name).preload()
 
     def get_variable(self, name: str) -> Variable:
         """ Returns the variable with the given name """
-        assert name in self.list_variables(), f"The variable '{name}' does not exist in module {self.address()}"
+        assert name in self._var, f"The variable '{name}' does not exist in module {self.address()}"
         return self._var[name]
 
     def list_variables(self) -> List[str]:
@@ -361,7 +609,7 @@ class Module(Element):
 
     def get_action(self, name) -> Action:
         """ Returns the action with the given name """
-        assert name in self.list_actions(), f"The action '{name}' does not exist in device {self.address()}"
+        assert name in self._act, f"The action '{name}' does not exist in device {self.address()}"
         return self._act[name]
 
     def list_actions(self) -> List[str]:
@@ -372,25 +620,55 @@ class Module(Element):
         """ Returns the list of the names of all the elements of this module """
         return self.list_modules() + self.list_variables() + self.list_actions()
 
+    def set_max_age(self, max_age: Optional[float]):
+        """ Sets the read cache max_age of all the variables of this module
+        and its submodules (see Variable.set_max_age) """
+        self._max_age = max_age  # for the submodules not built yet
+        for var in self._var.values():
+            var.set_max_age(max_age)
+        for mod in list(self._mod.values()):
+            mod.set_max_age(max_age)
+
+    def _has_name(self, name: str) -> bool:
+        """ Returns True if an element of this module has the given name """
+        return name in self._mod_configs or name in self._var or name in self._act
+
     def __getattr__(self, attr: str) -> Element:
-        if attr in self.list_variables(): return self.get_variable(attr)
-        if attr in self.list_actions(): return self.get_action(attr)
-        if attr in self.list_modules(): return self.get_module(attr)
+        if attr in self._var: return self._var[attr]
+        if attr in self._act: return self._act[attr]
+        if attr in self._mod_configs: return self.get_module(attr)
         raise AttributeError(f"'{attr}' not found in module '{self.address()}'")
 
     def get_structure(self) -> List[Tuple[str, str]]:
         """ Returns the structure of the module as a list containing each element address associated with its type as
         [['address1', 'variable'], ['address2', 'action'],...] """
-        structure = []
+        return [element for element in self._get_structure()
+                if element[1] != 'module']
+
+    def _get_structure(self) -> List[Tuple[str, str]]:
+        """ Returns the structure of the module including the submodules
+        addresses. The submodules not built yet are read from their driver
+        model without being built. Computed once, the driver model is static.
+        The addresses use the attribute names (see clean_string) """
+        if self._structure is None:
+            address = _attribute_address(self)
+            structure = []
+
+            for name, config in self._mod_configs.items():
+                if name in self._mod:
+                    structure.append((f'{address}.{name}', 'module'))
+                    structure += self._mod[name]._get_structure()
+                else:
+                    structure += _get_model_structure(
+                        f'{address}.{name}', config['object'])
+            for name in self._var:
+                structure.append((f'{address}.{name}', 'variable'))
+            for name in self._act:
+                structure.append((f'{address}.{name}', 'action'))
 
-        for mod in self.list_modules():
-            structure += self.get_module(mod).get_structure()
-        for var in self.list_variables():
-            structure.append((self.get_variable(var).address(), 'variable'))
-        for act in self.list_actions():
-            structure.append((self.get_action(act).address(), 'action'))
+            self._structure = structure
 
-        return structure
+        return self._structure
 
     def sub_hierarchy(self, level: int = 0) -> List[Tuple[str, str, int]]:
         ''' Returns a list of the sub hierarchy of this module
@@ -402,12 +680,11 @@ class Module(Element):
         if isinstance(self, Device): h.append((self.name, 'Device/Module', level))
         else: h.append((self.name, 'Module', level))
 
-        for mod in self.list_modules():
-            h += self.get_module(mod).sub_hierarchy(level+1)
-        for var in self.list_variables():
-            h.append((var, 'Variable', level+1))
-        for act in self.list_actions():
-            h.append((act, 'Action', level+1))
+        # Built from the cached structure, doesn't build the submodules
+        depth = _attribute_address(self).count('.')
+        for address, element_type in self._get_structure():
+            h.append((address.split('.')[-1], element_type.capitalize(),
+                      level + address.count('.') - depth))
 
         return h
 
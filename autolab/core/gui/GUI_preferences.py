@@ -211,6 +211,17 @@ class PreferencesWindow(QtWidgets.QMainWindow):
         self.inputs_autolab[main_key][sub_key] = input_widget
         group_layout.addRow(input_widget)
 
+        sub_key = 'frame_buffer'
+        saved_value = autolab_config[main_key][sub_key]
+        input_widget = QtWidgets.QSpinBox()
+        input_widget.setSizePolicy(
+            QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        input_widget.setToolTip('Select the number of 1D arrays kept in monitor history in waterfall mode')
+        input_widget.setRange(1, 100000)
+        input_widget.setValue(int(float(saved_value)))
+        self.inputs_autolab[main_key][sub_key] = input_widget
+        group_layout.addRow(QtWidgets.QLabel(sub_key), input_widget)
+
         ## scanner
         main_key = 'scanner'
         group_box = QtWidgets.QGroupBox(main_key)
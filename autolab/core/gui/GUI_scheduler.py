@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+from typing import Callable, List
+
+from qtpy import QtCore, QtWidgets
+
+from .GUI_utilities import qt_object_exists
+
+
+class RenderTimer:
+    """ Drop-in replacement of the QTimer used to refresh a window.
+    Refreshs are not triggered by a dedicated QTimer but by the shared
+    RenderScheduler which adapts the refresh rate to the measured cost of the
+    callback, the number of opened windows and their visibility.
+    The interval given is the minimal interval between two refreshs. """
+
+    def __init__(self, widget: QtWidgets.QWidget, callback: Callable,
+                 interval: int = 33):
+
+        self.widget = widget
+        self.callback = callback
+        self.min_interval = interval / 1000  # s
+        self.interval = self.min_interval  # adapted interval (s)
+        self.cost = None  # moving average of callback duration (s)
+        self.last_call = 0
+        self.active = False
+
+    def setInterval(self, interval: int):
+        """ Set the minimal interval between two refreshs in ms """
+        self.min_interval = interval / 1000
+        self.interval = self.min_interval
+
+    def start(self):
+        """ Register the timer to the scheduler """
+        self.active = True
+        get_scheduler().register(self)
+
+    def stop(self):
+        """ Unregister the timer from the scheduler """
+        self.active = False
+        get_scheduler().unregister(self)
+
+    def isActive(self) -> bool:
+        return self.active
+
+    def isVisible(self) -> bool:
+        """ Returns True if the window of the timer is shown on screen """
+        window = self.widget.window()
+        return window.isVisible() and not window.isMinimized()
+
+
+class RenderScheduler(QtCore.QObject):
+    """ Single timer shared by all the GUI refreshs (scanner, monitors, plotter).
+    Each RenderTimer is called when its interval is elapsed. The interval of a
+    visible window is increased if its refresh is costly, in order to keep the
+    time spent rendering below duty_cycle of the GUI time. Hidden or minimized
+    windows are only refreshed every hidden_interval to empty their queue. """
+
+    tick_interval = 15  # ms
+    max_interval = 1  # s
+    hidden_interval = 1  # s
+    duty_cycle = 0.5  # maximal fraction of GUI time used for rendering
+    smoothing = 0.2  # weight of the last measure in the cost moving average
+
+    def __init__(self):
+
+        super().__init__()
+        self.timers: List[RenderTimer] = []
+        self._rendering = False
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(self.tick_interval)
+        self.timer.timeout.connect(self.tick)
+
+    def register(self, render_timer: RenderTimer):
+        """ Add a timer to the scheduled timers """
+        if render_timer not in self.timers:
+            self.timers.append(render_timer)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def unregister(self, render_timer: RenderTimer):
+        """ Remove a timer from the scheduled timers """
+        if render_timer in self.timers:
+            self.timers.remove(render_timer)
+        if len(self.timers) == 0:
+            self.timer.stop()
+
+    def tick(self):
+        """ Call every timer which interval has elapsed """
+        if self._rendering: return None  # Previous render not finished
+        self._rendering = True
+
+        try:
+            for render_timer in self.timers.copy():
+                if not qt_object_exists(render_timer.widget):
+                    self.unregister(render_timer)
+            visible = [render_timer for render_timer in self.timers
+                       if render_timer.isVisible()]
+            nb_visible = max(len(visible), 1)
+
+            for render_timer in self.timers.copy():
+                now = time.perf_counter()
+                if render_timer in visible:
+                    interval = render_timer.interval
+                else:
+                    interval = max(self.hidden_interval, render_timer.min_interval)
+                if (now - render_timer.last_call) < interval: continue
+
+                try:
+                    render_timer.callback()
+                except Exception as e:
+                    print(f'Error during GUI refresh: {e}', file=sys.stderr)
+                end = time.perf_counter()
+                # Scheduled from the previous due time and not from the end
+                # of the refresh, else the tick period rounds the interval up
+                # (33 ms called every 45 ms). Reset if late by an interval
+                render_timer.last_call += interval
+                if now - render_timer.last_call >= interval:
+                    render_timer.last_call = now
+
+                cost = end - now
+                if render_timer.cost is None:
+                    render_timer.cost = cost
+                else:
+                    render_timer.cost += self.smoothing * (cost - render_timer.cost)
+
+                # Slow down costly refreshs, shared between visible windows
+                interval = nb_visible * render_timer.cost / self.duty_cycle
+                interval = min(interval, self.max_interval)
+                render_timer.interval = max(interval, render_timer.min_interval)
+        finally:
+            self._rendering = False
+
+
+_scheduler = None
+
+
+def get_scheduler() -> RenderScheduler:
+    """ Returns the RenderScheduler shared by all GUI windows """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RenderScheduler()
+    return _scheduler
@@ -20,7 +20,7 @@ import pyqtgraph as pg
 from .icons import icons
 from ..paths import PATHS
 from ..config import get_GUI_config
-from ..devices import DEVICES, get_element_by_address
+from ..devices import DEVICES
 from ..variables import has_eval, EVAL, VARIABLES
 from ..utilities import SUPPORTED_EXTENSION
 
@@ -580,10 +580,10 @@ class MyLineEdit(QtWidgets.QLineEdit):
             #                     for item in dir(var)
             #                     if not item.startswith('_') and not item.isupper()]
         if self.use_devices:
-            list_keywords += [str(get_element_by_address(elements[0]).address())
-                          for device in DEVICES.values()
-                          if device.name not in list_keywords
-                          for elements in device.get_structure()]
+            list_keywords += [address
+                              for device in DEVICES.values()
+                              if device.name not in list_keywords
+                              for address in device.list_addresses()]
 
         if self.use_np_pd:
             if 'np' not in list_keywords:
@@ -7,7 +7,6 @@ Created on Mon Mar  4 14:54:41 2024
 
 from typing import Union
 import sys
-import re
 
 import numpy as np
 import pandas as pd
@@ -19,7 +18,8 @@ from ..devices import DEVICES
 from ..utilities import data_to_str, str_to_data, clean_string
 from ..variables import (VARIABLES, get_variable, set_variable, Variable,
                          rename_variable, remove_variable, is_Variable,
-                         has_variable, has_eval, eval_variable, EVAL)
+                         has_variable, has_eval, eval_variable,
+                         get_dependencies)
 from ..elements import Variable as Variable_og
 from ..devices import get_element_by_address
 from .GUI_instances import (openMonitor, openSlider, openPlotter,
@@ -397,19 +397,7 @@ class MyQTreeWidgetItem(QtWidgets.QTreeWidgetItem):
             if not has_eval(raw_value):
                 raw_value = str_to_data(raw_value)
             else:
-                # get all variables
-                raw_value_check = raw_value[len(EVAL): ]  # Allows variable with name 'eval'
-                pattern1 = r'[a-zA-Z][a-zA-Z0-9._]*'
-                matches1 = re.findall(pattern1, raw_value_check)
-                # get variables not unclosed by ' or " (gives bad name so needs to check with all variables)
-                pattern2 = r'(?<!["\'])([a-zA-Z][a-zA-Z0-9._]*)(?!["\'])'
-                matches2 = re.findall(pattern2, raw_value_check)
-                matches = list(set(matches1) & set(matches2))
-                # Add device/variable name to matches
-                for match in list(matches):
-                    matches.append(match.split('.')[0])
-                matches = list(set(matches))
-                assert name not in matches, f"Variable '{name}' name can't be used in eval to avoid circular definition"
+                assert name not in get_dependencies(raw_value), f"Variable '{name}' name can't be used in eval to avoid circular definition"
         except Exception as e:
             self.gui.setStatus(f'Error: {e}', 10000, False)
         else:
@@ -208,6 +208,7 @@ class ControlCenter(QtWidgets.QMainWindow):
         self.tree.setDragDropMode(QtWidgets.QAbstractItemView.DragOnly)
         self.tree.header().setStretchLastSection(False)
         self.tree.itemClicked.connect(self.itemClicked)
+        self.tree.itemExpanded.connect(self.itemExpanded)
         self.tree.itemPressed.connect(self.itemPressed)
         self.tree.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.rightClick)
@@ -544,18 +545,25 @@ class ControlCenter(QtWidgets.QMainWindow):
 
     def associate(self, item: QtWidgets.QTreeWidgetItem, module: Device):
         """ Function called to associate a main module to one item in the tree """
-        # load the entire module (submodules, variables, actions)
+        # load the module (variables, actions), submodules are loaded on expansion
         item.load(module)
 
-        read_init_list = module._read_init_list
-        for mod in module._mod.values():
-            read_init_list.extend(mod._read_init_list)
-        for variable in read_init_list:
+        self.readInit(item)
+
+    def itemExpanded(self, item: QtWidgets.QTreeWidgetItem):
+        """ Function called when an item is expanded in the tree.
+            Loads the submodule of the item on its first expansion """
+        if isinstance(item, TreeWidgetItemModule):
             try:
-                variable()
-            except:
-                self.setStatus(f"Can't read variable {variable.address()} on instantiation",
-                               10000, False)
+                if item.loadSubModule(): self.readInit(item)
+            except Exception as e:
+                self.setStatus(f"Can't load module {item.name}: {e}", 10000, False)
+
+    def readInit(self, item: TreeWidgetItemModule):
+        """ Reads the variables of the module of item to be read on
+        instantiation, in a thread to not wait for the device in the GUI """
+        if item.module._read_init_list:
+            self.threadManager.start(item, 'readInit', value=item.module)
 
     def openScanner(self):
         """ This function open the scanner. """
@@ -28,27 +28,30 @@ class ThreadManager:
     def start(self, item: QtWidgets.QTreeWidgetItem, intType: str, value = None):
         """ This function is called when a new thread is requested,
         for a particular intType interaction type """
-        # GUI disabling
-        item.setDisabled(True)
+        # GUI disabling, the tree stays usable while reading the variables of
+        # a module on instantiation
+        if intType != 'readInit':
+            item.setDisabled(True)
 
-        if hasattr(item, "execButton") and qt_object_exists(item.execButton):
-            item.execButton.setEnabled(False)
-        if hasattr(item, "readButton") and qt_object_exists(item.readButton):
-            item.readButton.setEnabled(False)
-        if hasattr(item, "valueWidget") and qt_object_exists(item.valueWidget):
-            item.valueWidget.setEnabled(False)
+            if hasattr(item, "execButton") and qt_object_exists(item.execButton):
+                item.execButton.setEnabled(False)
+            if hasattr(item, "readButton") and qt_object_exists(item.readButton):
+                item.readButton.setEnabled(False)
+            if hasattr(item, "valueWidget") and qt_object_exists(item.valueWidget):
+                item.valueWidget.setEnabled(False)
 
-        # disabling valueWidget deselect item and select next one, need to disable all items and reenable item
-        for item_selected in self.gui.tree.selectedItems():
-            item_selected.setSelected(False)
+            # disabling valueWidget deselect item and select next one, need to disable all items and reenable item
+            for item_selected in self.gui.tree.selectedItems():
+                item_selected.setSelected(False)
 
-        item.setSelected(True)
+            item.setSelected(True)
 
         # Status writing
         if intType == 'read': status = f'Reading {item.variable.address()}...'
         elif intType == 'write': status = f'Writing {item.variable.address()}...'
         elif intType == 'execute': status = f'Executing {item.action.address()}...'
         elif intType == 'load': status = f'Loading device {item.name}...'
+        elif intType == 'readInit': status = f'Reading {item.name} on instantiation...'
         self.gui.setStatus(status)
 
         # Thread configuration
@@ -85,6 +88,8 @@ class ThreadManager:
                 self.gui.clearStatus()
 
         item = self.threads[tid].item
+        if self.threads[tid].intType == 'readInit': return None
+
         if qt_object_exists(item):
             item.setDisabled(False)
             item.setValueKnownState(-1 if error else True)
@@ -133,6 +138,13 @@ class InteractionThread(QtCore.QThread):
                     self.item.action(self.value)
                 else:
                     self.item.action()
+            elif self.intType == 'readInit':
+                failed = []
+                for variable in self.value._read_init_list:
+                    try: variable()
+                    except: failed.append(variable.address())
+                if failed:
+                    error = f"Can't read variable {', '.join(failed)} on instantiation"
             # elif self.intType == 'load':
             #     # Note that threadItemDict needs to be updated outside of thread to avoid timing error
             #     module = devices.get_device(self.item.name)  # Try to get / instantiated the device
@@ -47,15 +47,15 @@ class TreeWidgetItemModule(QtWidgets.QTreeWidgetItem):
         self.setTextAlignment(1, QtCore.Qt.AlignHCenter)
 
     def load(self, module):
-        """ This function loads the entire module (submodules, variables, actions) """
+        """ This function loads the module (variables, actions). The submodules
+        are loaded when their item is expanded (see loadSubModule) """
         self.module = module
 
         # Submodules
         subModuleNames = self.module.list_modules()
         for subModuleName in subModuleNames:
-            subModule = getattr(self.module, subModuleName)
             item = TreeWidgetItemModule(self, subModuleName, self.gui)
-            item.load(subModule)
+            item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
 
         # Variables
         varNames = self.module.list_variables()
@@ -75,6 +75,15 @@ class TreeWidgetItemModule(QtWidgets.QTreeWidgetItem):
         # Tooltip
         if self.module._help is not None: self.setToolTip(0, self.module._help)
 
+    def loadSubModule(self) -> bool:
+        """ Builds and loads the submodule of this item if not done yet.
+        Returns True if loaded by this call """
+        if self.loaded or self.is_not_submodule: return False
+        parent = self.parent()
+        if parent is None or parent.module is None: return False
+        self.load(parent.module.get_module(self.name))
+        return True
+
     def menu(self, position: QtCore.QPoint):
         """ This function provides the menu when the user right click on an item """
         if self.is_not_submodule:
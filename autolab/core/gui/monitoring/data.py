@@ -10,6 +10,63 @@ import pandas as pd
 import numpy as np
 from qtpy import QtWidgets
 
+from ...config import get_monitor_config
+
+
+class FrameBuffer:
+    """ Fixed-capacity ring of frames stored in a single preallocated array.
+    Frames are copied in place, no allocation is done per frame unless the
+    frame shape or dtype changes.
+    Each frame is stored twice, at index and index + capacity, so that the
+    history in chronological order is always a contiguous view of the array,
+    returned by get without copy. """
+
+    def __init__(self, capacity: int):
+
+        self.capacity = max(int(capacity), 1)
+        self.buffer = None  # shape (2*capacity, \*frame_shape)
+        self.index = -1  # position of the latest frame
+        self.count = 0  # number of valid frames
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, frame: np.ndarray):
+        """ Copy frame in the ring, overwriting the oldest one if full """
+        frame = np.asarray(frame)
+        if (self.buffer is None
+                or self.buffer.shape[1:] != frame.shape
+                or self.buffer.dtype != frame.dtype):
+            size = 2*self.capacity if self.capacity > 1 else 1
+            self.buffer = np.empty((size, *frame.shape), dtype=frame.dtype)
+            self.index = -1
+            self.count = 0
+
+        self.index = (self.index + 1) % self.capacity
+        self.buffer[self.index] = frame
+        if self.capacity > 1:
+            self.buffer[self.index + self.capacity] = frame
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self) -> np.ndarray:
+        """ Returns a view on the latest frame """
+        if self.count == 0: return None
+        return self.buffer[self.index]
+
+    def get(self) -> np.ndarray:
+        """ Returns a view on the stored frames in chronological order
+        (oldest first) """
+        if self.count == 0: return None
+        if self.count < self.capacity or self.capacity == 1:
+            return self.buffer[: self.count]
+        start = self.index + 1
+        return self.buffer[start: start + self.capacity]
+
+    def clear(self):
+        """ Forget stored frames but keep the allocated buffer """
+        self.index = -1
+        self.count = 0
+
 
 class DataManager:
 
@@ -20,6 +77,19 @@ class DataManager:
         self.xlist = []
         self.ylist = []
 
+        # Frame history for the waterfall display of 1D arrays, only the
+        # latest frame is kept for the images
+        monitor_config = get_monitor_config()
+        self.frame_buffer = int(float(monitor_config['frame_buffer']))
+        self.frames = FrameBuffer(1)
+        self.waterfall = False
+
+    def setWaterfall(self, state: bool):
+        """ This function enables or disables the waterfall display of 1D arrays """
+        if state != self.waterfall:
+            self.waterfall = state
+            self.frames = FrameBuffer(self.frame_buffer if state else 1)
+
     def setWindowLength(self, value: float):
         """ This function set the value of the window length """
         self.windowLength = value
@@ -72,9 +142,16 @@ class DataManager:
             self._addPoint(point)
 
     def _addImage(self, image: np.ndarray):
-        """ Add image to ylist data as np.ndarray """
+        """ Add image to the frame buffer and display the latest frame """
+        self.frames.append(image)
+        self.xlist = None
+        self.ylist = self.frames.latest()
+
+    def _addTrace(self, trace: np.ndarray):
+        """ Add 1D array to the frame buffer and display the history as an image """
+        self.frames.append(trace)
         self.xlist = None
-        self.ylist = image
+        self.ylist = self.frames.get()
 
     def _addArray(self, array: np.ndarray):
         """ This function replace an dataset [x,y] x is time y is array """
@@ -84,6 +161,9 @@ class DataManager:
             self.ylist = np.array([y_array])
         elif len(array.shape) == 1:
             y_array = array
+            if self.waterfall:
+                self._addTrace(y_array)
+                return None
             # Replace data
             self.xlist = np.arange(len(y_array))
             self.ylist = np.array(y_array)
@@ -111,6 +191,7 @@ class DataManager:
             self.ylist.pop(0)
 
     def clear(self):
+        self.frames.clear()
         try:
             self.xlist.clear()
             self.ylist.clear()
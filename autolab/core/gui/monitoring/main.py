@@ -17,6 +17,7 @@ from .monitor import MonitorManager
 from ..icons import icons
 from ..GUI_utilities import get_font_size, setLineEditBackground
 from ..GUI_instances import clearMonitor
+from ..GUI_scheduler import RenderTimer
 from ...paths import PATHS
 from ...utilities import SUPPORTED_EXTENSION
 from ...elements import Variable as Variable_og
@@ -40,9 +41,7 @@ class Monitor(QtWidgets.QMainWindow):
         self.setWindowIcon(icons['monitor'])
         # Queue
         self.queue = queue.Queue()
-        self.timer = QtCore.QTimer(self)
-        self.timer.setInterval(33)  # 30fps
-        self.timer.timeout.connect(self.sync)
+        self.timer = RenderTimer(self, self.sync, 33)  # 30fps max
 
         # Window length
         self.windowLength_lineEdit.setText('10')
@@ -71,12 +70,15 @@ class Monitor(QtWidgets.QMainWindow):
         self.mean_checkBox.clicked.connect(self.mean_checkBoxClicked)
         self.min_checkBox.clicked.connect(self.min_checkBoxClicked)
         self.max_checkBox.clicked.connect(self.max_checkBoxClicked)
+        self.waterfall_checkBox.clicked.connect(self.waterfall_checkBoxClicked)
 
         # Managers
         self.dataManager = DataManager(self)
         self.figureManager = FigureManager(self)
         self.monitorManager = MonitorManager(self)
 
+        self.skipped_frames = 0
+
         # Start
         self.windowLengthChanged()
         self.delayChanged()
@@ -122,6 +124,11 @@ class Monitor(QtWidgets.QMainWindow):
             xlist, ylist = self.dataManager.getData()
             self.figureManager.update(xlist, ylist)
 
+        skipped_frames = self.monitorManager.getSkippedFrames()
+        if skipped_frames != self.skipped_frames:
+            self.skipped_frames = skipped_frames
+            self.setStatus(f'{skipped_frames} frames skipped (acquisition faster than display)', 5000)
+
     def pauseButtonClicked(self):
         """ This function pause or resume the monitoring """
         if self.monitorManager.isPaused():
@@ -193,6 +200,10 @@ class Monitor(QtWidgets.QMainWindow):
 
         if len(xlist) > 0: self.figureManager.update(xlist, ylist)
 
+    def waterfall_checkBoxClicked(self):
+        """ This function enables or disables the waterfall display of 1D arrays """
+        self.dataManager.setWaterfall(self.waterfall_checkBox.isChecked())
+
     def pause_on_scan_checkBoxClicked(self):
         """ Change pause_on_scan variable """
         self.pause_on_scan = self.pause_on_scan_checkBox.isChecked()
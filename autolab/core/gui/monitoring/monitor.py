@@ -15,6 +15,8 @@ from qtpy import QtCore, QtWidgets
 
 from ...variables import Variable
 from ...elements import Variable as Variable_og
+from ...io_scheduler import set_io_priority
+from ...server import RemoteElement
 
 
 class MonitorManager:
@@ -45,6 +47,10 @@ class MonitorManager:
         """ Returns the current delay of the thread """
         return self.thread.delay
 
+    def getSkippedFrames(self) -> int:
+        """ Returns the number of arrays dropped because the GUI was too slow """
+        return self.thread.skipped_frames
+
     def isPaused(self):
         """ This function returns whether the thread is paused or not """
         return self.thread.pauseFlag.is_set()
@@ -65,10 +71,15 @@ class MonitorManager:
 
 
 class MonitorThread(QtCore.QThread):
-    """ This thread class is dedicated to read the variable, and send its data to GUI through a queue """
+    """ This thread class is dedicated to read the variable, and send its data to GUI through a queue.
+    The variables of a remote device (autolab_server driver) are not read but
+    received from a subscription to the server, every delay seconds """
 
     errorSignal = QtCore.Signal(object)
 
+    # The oldest pending array is dropped if the GUI has this many pending items
+    max_pending_frames = 3
+
     def __init__(self, variable: Union[Variable, Variable_og], queue: Queue):
 
         super().__init__()
@@ -79,8 +90,45 @@ class MonitorThread(QtCore.QThread):
         self.stopFlag = threading.Event()
 
         self.delay = 0
+        self.skipped_frames = 0
+
+        read_function = getattr(variable, 'read_function', None)
+        self.remote_element = getattr(read_function, '__self__', None)
+        if not isinstance(self.remote_element, RemoteElement):
+            self.remote_element = None
+        self.subscription = None
+
+    def receive(self) -> list:
+        """ Returns the values pushed by the server for the remote variable,
+        subscribes again if the delay changed """
+        if self.subscription is not None and self.subscription.interval != self.delay:
+            self.unsubscribe()
+        if self.subscription is None:
+            self.subscription = self.remote_element.subscribe(self.delay)
+
+        update = self.subscription.get(timeout=0.1)
+        if update is None: return []
+        return [update[1]]
+
+    def unsubscribe(self):
+        """ Stops the subscription to the remote variable """
+        if self.subscription is not None:
+            try: self.subscription.close()
+            except Exception: pass
+            self.subscription = None
+
+    def drop_oldest_frame(self):
+        """ Removes the oldest array not yet read by the GUI from the queue,
+        so that the newest one is always displayed """
+        with self.queue.mutex:
+            for i, (_, value) in enumerate(self.queue.queue):
+                if isinstance(value, (np.ndarray, pd.DataFrame)):
+                    del self.queue.queue[i]
+                    self.skipped_frames += 1
+                    break
 
     def run(self):
+        set_io_priority('monitor')
 
         t_ini = time.time()
         pauseLength = 0
@@ -97,27 +145,42 @@ class MonitorThread(QtCore.QThread):
 
             try:
                 # Measure variable
-                value = self.variable()
-
-                # Check type
-                if not isinstance(value, (np.ndarray, pd.DataFrame)):  # should not float(array) because if 0D convert to float and loose information on type
-                    try:
-                        value = float(value)
-                    except TypeError:
-                        assert hasattr(value, "shape"), "If data is not a float, should be an array or a dataframe"
-
-                # Send signal new data
-                self.queue.put([now, value])
+                if self.remote_element is None:
+                    values = [self.variable()]
+                else:
+                    values = self.receive()
+                    now = time.time() - t_ini - pauseLength
+
+                for value in values:
+                    # Check type
+                    if not isinstance(value, (np.ndarray, pd.DataFrame)):  # should not float(array) because if 0D convert to float and loose information on type
+                        try:
+                            value = float(value)
+                        except TypeError:
+                            assert hasattr(value, "shape"), "If data is not a float, should be an array or a dataframe"
+
+                    # Drop the oldest pending array if acquisition is faster than rendering
+                    if (isinstance(value, (np.ndarray, pd.DataFrame))
+                            and self.queue.qsize() >= self.max_pending_frames):
+                        self.drop_oldest_frame()
+
+                    # Send signal new data
+                    self.queue.put([now, value])
 
             except Exception as e:
                 self.errorSignal.emit(e)
                 self.pauseFlag.set()
 
             # If not the thread may be too fast
-            time.sleep(self.delay)
+            if self.remote_element is None:
+                time.sleep(self.delay)
 
             # pause
+            if self.pauseFlag.is_set():
+                self.unsubscribe()
             while self.pauseFlag.is_set():
                 if pauseStartedTime is None:
                     pauseStartedTime = time.time()
                 time.sleep(0.1)
+
+        self.unsubscribe()
@@ -5,10 +5,12 @@ Created on Oct 2022
 @author: jonathan based on qchat
 """
 
-from typing import List, Union, Any
+from typing import List, Union, Any, Callable
 import os
 import sys
 import csv
+import threading
+from io import StringIO
 
 import numpy as np
 import pandas as pd
@@ -20,6 +22,7 @@ except:
 
 from qtpy import QtWidgets
 
+from .thread import ImportThread
 from ...paths import PATHS
 from ...config import load_config
 from ...utilities import data_to_dataframe, SUPPORTED_EXTENSION
@@ -28,45 +31,56 @@ from ...elements import Variable as Variable_og
 from ...variables import list_variables, get_variable, Variable
 
 
-def find_delimiter(filename):
-    sniffer = csv.Sniffer()
+SNIFF_SIZE = 65536  # characters read to guess the file format
+CHUNK_SIZE = 100000  # rows read at once for text files
+BINARY_EXTENSION = ('.npy', '.h5', '.hdf5', '.parquet')
+IMPORT_EXTENSION = ("Text Files (*.txt);; Supported text Files (*.txt;*.csv;*.dat);; "
+                    "Binary Files (*.npy;*.h5;*.hdf5;*.parquet);; Any Files (*)")
+
+
+def sniff_file(filename: str, size: int = SNIFF_SIZE) -> str:
+    """ Returns the beginning of the file, used to guess its format """
     with open(filename) as fp:
-        try:
-            text = fp.read(5000)
-            if text.startswith("#"):
-                text = text[len(text.split("\n")[0])+len("\n"):]
-            delimiter = sniffer.sniff(text).delimiter
-        except:
-            # delimiter = ","  # only 1 column
-            delimiter = no_default
-        if delimiter in ("e", "."):  # sniffer got it wrong
-            delimiter = no_default
+        text = fp.read(size)
+    if len(text) == size and '\n' in text:
+        text = text[: text.rfind('\n')+1]  # remove last line which may be truncated
+    return text
+
+
+def find_delimiter(text: str):
+    sniffer = csv.Sniffer()
+    try:
+        text = text[: 5000]
+        if text.startswith("#"):
+            text = text[len(text.split("\n")[0])+len("\n"):]
+        delimiter = sniffer.sniff(text).delimiter
+    except:
+        # delimiter = ","  # only 1 column
+        delimiter = no_default
+    if delimiter in ("e", "."):  # sniffer got it wrong
+        delimiter = no_default
     return delimiter
 
 
-def _skiprows(filename):
-    with open(filename) as fp:
-        if fp.read(1) not in ("#", "!", "\n"):
-            skiprows = None
-        else:
-            skiprows = 1
-            fp.readline()
-            while fp.read(1) in ("#", "!", "\n"):
-                skiprows += 1
-                fp.readline()
-    return skiprows
+def _skiprows(text: str):
+    skiprows = 0
+    for line in text.splitlines(keepends=True):
+        if line[: 1] not in ("#", "!", "\n"):
+            break
+        skiprows += 1
+    return skiprows if skiprows != 0 else None
 
 
-def find_header(filename, sep=no_default, skiprows=None):
+def find_header(text: str, sep=no_default, skiprows=None):
     try:
-        df = pd.read_csv(filename, sep=sep, header=None, nrows=5, skiprows=skiprows)
+        df = pd.read_csv(StringIO(text), sep=sep, header=None, nrows=5, skiprows=skiprows)
     except Exception:
         if type(skiprows) is not None: skiprows += 1
-        df = pd.read_csv(filename, sep=sep, header=None, nrows=5, skiprows=skiprows)
+        df = pd.read_csv(StringIO(text), sep=sep, header=None, nrows=5, skiprows=skiprows)
     else:
         if skiprows == 1:
             try:
-                df_columns = pd.read_csv(filename, sep=sep, header="infer",
+                df_columns = pd.read_csv(StringIO(text), sep=sep, header="infer",
                                          skiprows=0, nrows=0)
             except Exception:
                 pass
@@ -84,31 +98,98 @@ def find_header(filename, sep=no_default, skiprows=None):
                 else (None, skiprows, no_default))
     except:
         pass
-    df_header = pd.read_csv(filename, sep=sep, nrows=5, skiprows=skiprows)
+    df_header = pd.read_csv(StringIO(text), sep=sep, nrows=5, skiprows=skiprows)
 
     return (("infer", skiprows, no_default)
             if tuple(df.dtypes) != tuple(df_header.dtypes)
             else (None, skiprows, no_default))
 
 
-def importData(filename):
-    """ This function open the data with the provided filename """
+def _read_csv_chunks(fp, size: int, progress: Callable, preview: Callable,
+                     stop_flag: threading.Event, **kwargs) -> List[pd.DataFrame]:
+    """ Returns the chunks of the text file fp read with pd.read_csv(**kwargs),
+    None if stop_flag is set before the end of the reading """
+    chunks = []
+    reader = pd.read_csv(fp, chunksize=CHUNK_SIZE, **kwargs)
+    chunk = next(reader, None)
+    while chunk is not None:
+        chunks.append(chunk)
+        if stop_flag is not None and stop_flag.is_set(): return None
+        if progress is not None: progress(min(fp.tell() / size, 1))
+        chunk = next(reader, None)
+        if preview is not None and chunk is not None and len(chunks) == 1:
+            preview(data_to_dataframe(chunks[0], cache=False))
+
+    return chunks
+
+
+def importBinary(filename: str) -> pd.DataFrame:
+    """ This function open NumPy (.npy), HDF5 (.h5, .hdf5) and Parquet
+    (.parquet) files. For HDF5, the first dataset found is imported """
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension == '.npy':
+        data = np.load(filename, allow_pickle=False)
+    elif extension in ('.h5', '.hdf5'):
+        try:
+            import h5py
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("Package 'h5py' is required to import HDF5 files")
+        with h5py.File(filename, 'r') as file:
+            datasets = []
+            file.visititems(lambda name, obj: datasets.append(obj) if (
+                isinstance(obj, h5py.Dataset) and len(datasets) == 0) else None)
+            assert len(datasets) != 0, f"No dataset found in {filename}"
+            data = datasets[0][()]
+        if data.dtype.names is not None:  # compound dataset -> named columns
+            data = pd.DataFrame.from_records(data)
+    elif extension == '.parquet':
+        data = pd.read_parquet(filename)
+    else:
+        raise ValueError(f"Extension '{extension}' is not a supported binary format")
 
-    skiprows = _skiprows(filename)
-    sep = find_delimiter(filename)
-    (header, skiprows, columns) = find_header(filename, sep, skiprows)
-    try:
-        data = pd.read_csv(filename, sep=sep, header=header,
-                           skiprows=skiprows, names=columns)
-    except TypeError:
-        data = pd.read_csv(filename, sep=sep, header=header,
-                           skiprows=skiprows, names=None)  # for pandas 1.2: names=None but sep=no_default
-    except:
-        data = pd.read_csv(filename, sep="\t", header=header,
-                           skiprows=skiprows, names=columns)
+    assert len(data) != 0, "Can't import empty DataFrame"
+    return data_to_dataframe(data, cache=False)
+
+
+def importData(filename: str, progress: Callable = None,
+               preview: Callable = None,
+               stop_flag: threading.Event = None) -> pd.DataFrame:
+    """ This function open the data with the provided filename.
+    Text files are read by chunks: progress(fraction) is called after each
+    chunk and preview(data) with the first chunk if the file contains several
+    (once more if the file is read again with the fallback options).
+    Returns None if stop_flag is set before the end of the reading """
+    if os.path.splitext(filename)[1].lower() in BINARY_EXTENSION:
+        return importBinary(filename)
+
+    text = sniff_file(filename)
+    skiprows = _skiprows(text)
+    sep = find_delimiter(text)
+    (header, skiprows, columns) = find_header(text, sep, skiprows)
+
+    size = max(os.path.getsize(filename), 1)
+    options = (size, progress, preview, stop_flag)
+    with open(filename, 'rb') as fp:
+        # If any chunk is not accepted by pandas, the whole file is read again
+        # with the fallback options
+        try:
+            chunks = _read_csv_chunks(fp, *options, sep=sep, header=header,
+                                      skiprows=skiprows, names=columns)
+        except TypeError:
+            fp.seek(0)
+            chunks = _read_csv_chunks(fp, *options, sep=sep, header=header,
+                                      skiprows=skiprows, names=None)  # for pandas 1.2: names=None but sep=no_default
+        except:
+            fp.seek(0)
+            chunks = _read_csv_chunks(fp, *options, sep="\t", header=header,
+                                      skiprows=skiprows, names=columns)
 
+    if chunks is None: return None
+    assert len(chunks) != 0, "Can't import empty DataFrame"
+    data = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
     assert len(data) != 0, "Can't import empty DataFrame"
-    data = data_to_dataframe(data)
+    data = data_to_dataframe(data, cache=False)
     return data
 
 
@@ -119,6 +200,8 @@ class DataManager:
         self.gui = gui
         self._clear()
         self.overwriteData = True
+        self.importThread = None
+        self.previewDatasets = {}
 
         plotter_config = load_config("plotter_config")
         if ('device' in plotter_config.sections()
@@ -212,32 +295,87 @@ class DataManager:
         and import the dataset"""
         filenames = QtWidgets.QFileDialog.getOpenFileNames(
             self.gui, "Import data file", PATHS['last_folder'],
-            filter=SUPPORTED_EXTENSION)[0]
+            filter=IMPORT_EXTENSION)[0]
         if not filenames:
             return None
         else:
             self.importAction(filenames)
 
     def importAction(self, filenames: List[str]):
-        dataset = None
-        for i, filename in enumerate(filenames):
-            try:
-                dataset = self.importData(filename)
-            except Exception as e:
-                self.gui.setStatus(
-                    f"Impossible to load data from {filename}: {e}",
-                    10000, False)
-                if len(filenames) != 1:
-                    print(f"Impossible to load data from {filename}: {e}",
-                          file=sys.stderr)
-            else:
-                self.gui.setStatus(f"File {filename} loaded successfully", 5000)
-        if dataset is not None:
-            self.gui.figureManager.start(dataset)
+        """ This function imports the files in a thread to not freeze the GUI """
+        if self.importThread is not None:
+            self.gui.setStatus("Wait for the end of the current import", 5000, False)
+            return None
 
-        path = os.path.dirname(filename)
+        self.previewDatasets = {}
+        self.importThread = ImportThread(filenames)
+        self.importThread.progressSignal.connect(self.importProgress)
+        self.importThread.previewSignal.connect(self.importPreview)
+        self.importThread.dataSignal.connect(self.importFinished)
+        self.importThread.errorSignal.connect(
+            lambda filename, e: self.importError(filename, e, len(filenames)))
+        self.importThread.finished.connect(self.importEnded)
+
+        self.gui.import_progressBar.setValue(0)
+        self.gui.import_progressBar.show()
+        self.gui.import_cancelButton.show()
+        self.gui.setStatus(f"Loading {filenames[0]}...")
+        self.importThread.start()
+
+        path = os.path.dirname(filenames[-1])
         PATHS['last_folder'] = path
 
+    def importCancel(self):
+        """ This function stops the current import """
+        if self.importThread is not None:
+            self.importThread.stopFlag.set()
+
+    def importProgress(self, filename: str, progress: float):
+        """ Called by the import thread after each chunk """
+        self.gui.import_progressBar.setValue(int(progress * 100))
+
+    def importPreview(self, filename: str, data: pd.DataFrame):
+        """ Display the first chunk of a large file while the rest is loading """
+        if filename in self.previewDatasets:  # file read again with other options
+            dataset = self.previewDatasets[filename]
+            dataset.update(Dataset(dataset.name, data))
+        else:
+            dataset = self._newImportedDataset(filename, data)
+            self.previewDatasets[filename] = dataset
+        self.gui.figureManager.start(dataset)
+        self.gui.setStatus(f"Loading {filename}... (preview)")
+
+    def importFinished(self, filename: str, data: pd.DataFrame):
+        """ Called by the import thread with the complete data of a file """
+        if filename in self.previewDatasets:
+            dataset = self.previewDatasets.pop(filename)
+            dataset.update(Dataset(dataset.name, data))
+        else:
+            dataset = self._newImportedDataset(filename, data)
+        self.gui.figureManager.start(dataset)
+        self.gui.setStatus(f"File {filename} loaded successfully", 5000)
+
+    def importError(self, filename: str, error: Exception, nb_files: int):
+        """ Called by the import thread if a file can't be loaded """
+        dataset = self.previewDatasets.pop(filename, None)
+        if dataset in self.datasets:  # remove the partial data of the preview
+            self.gui.data_comboBox.setCurrentIndex(self.datasets.index(dataset))
+            self.clear()
+        self.gui.setStatus(
+            f"Impossible to load data from {filename}: {error}", 10000, False)
+        if nb_files != 1:
+            print(f"Impossible to load data from {filename}: {error}",
+                  file=sys.stderr)
+
+    def importEnded(self):
+        """ Called when the import thread is finished """
+        if self.importThread.stopFlag.is_set():
+            self.gui.setStatus("Import canceled", 5000)
+        self.importThread = None
+        self.previewDatasets = {}
+        self.gui.import_progressBar.hide()
+        self.gui.import_cancelButton.hide()
+
     def importDeviceData(self, variable: Union[Variable, Variable_og, pd.DataFrame, Any]):
         """ This function open the data of the provided device """
         if isinstance(variable, pd.DataFrame):
@@ -249,8 +387,12 @@ class DataManager:
         else:
             name = 'data'
             data = variable
-        data = data_to_dataframe(data)  # format value
+        data = data_to_dataframe(data, cache=False)  # format value
+
+        return self.addDeviceData(name, data)
 
+    def addDeviceData(self, name: str, data: pd.DataFrame):
+        """ This function creates a dataset from already formated device data """
         if self.overwriteData:
             data_name = name
         else:
@@ -265,6 +407,10 @@ class DataManager:
         """ This function open the data with the provided filename """
         # OPTIMIZE: could add option to choose in GUI all options
         data = importData(filename)
+        return self._newImportedDataset(filename, data)
+
+    def _newImportedDataset(self, filename: str, data: pd.DataFrame):
+        """ This function creates a dataset named after filename """
         name = os.path.basename(filename)
 
         if self.overwriteData:
@@ -285,9 +431,11 @@ class DataManager:
 
             if not new_dataset.data.equals(current_dataset.data):
                 current_dataset.update(new_dataset)
-        else:
-            # Prepare a new dataset in the plotter
-            self.gui.dataManager.addDataset(new_dataset)
+            return current_dataset
+
+        # Prepare a new dataset in the plotter
+        self.gui.dataManager.addDataset(new_dataset)
+        return new_dataset
 
     def getData(self, nbDataset: int, var_list: List[str], selectedData: int = 0):
         """ This function returns to the figure manager the required data """
@@ -383,8 +531,7 @@ class DataManager:
     def newDataset(self, name: str, data: pd.DataFrame):
         """ This function creates a new dataset """
         dataset = Dataset(name, data)
-        self._addData(dataset)
-        return dataset
+        return self._addData(dataset)
 
     def updateDisplayableResults(self):
         """ This function update the combobox in the GUI that displays the
@@ -16,11 +16,12 @@ from qtpy import QtCore, QtWidgets, uic, QtGui
 
 from .figure import FigureManager
 from .data import DataManager
-from .thread import ThreadManager
+from .thread import ThreadManager, AcquisitionThread
 from .treewidgets import TreeWidgetItemModule
 from ..icons import icons
 from ..GUI_utilities import get_font_size, setLineEditBackground, MyLineEdit
 from ..GUI_instances import clearPlotter, closePlotter
+from ..GUI_scheduler import RenderTimer
 from ...devices import list_devices
 from ...elements import Variable as Variable_og
 from ...variables import Variable
@@ -126,6 +127,17 @@ class Plotter(QtWidgets.QMainWindow):
         # Open button
         self.openButton.clicked.connect(self.dataManager.importActionClicked)
 
+        # Import progress
+        self.import_progressBar = QtWidgets.QProgressBar()
+        self.import_progressBar.setMaximumWidth(150)
+        self.import_progressBar.hide()
+        self.statusBar.addPermanentWidget(self.import_progressBar)
+        self.import_cancelButton = QtWidgets.QPushButton('Cancel')
+        self.import_cancelButton.setToolTip('Cancel the data import')
+        self.import_cancelButton.clicked.connect(self.dataManager.importCancel)
+        self.import_cancelButton.hide()
+        self.statusBar.addPermanentWidget(self.import_cancelButton)
+
         # comboBox with data id
         self.data_comboBox.activated.connect(self.dataManager.data_comboBoxClicked)
 
@@ -158,9 +170,10 @@ class Plotter(QtWidgets.QMainWindow):
 
         # Timer
         self.timer_time = 0.5  # This plotter is not meant for fast plotting like the monitor, be aware it may crash with too high refreshing rate
-        self.timer = QtCore.QTimer(self)
-        self.timer.setInterval(int(self.timer_time*1000)) # ms
-        self.timer.timeout.connect(self.autoRefreshPlotData)
+        self.acquisitionThread = None
+        self.acquisitionQueue = queue.Queue()
+        self.timer = RenderTimer(self, self.autoRefreshPlotData,
+                                 int(self.timer_time*1000))  # ms
 
         self.auto_plotDataButton.clicked.connect(self.autoRefreshChanged)
 
@@ -343,6 +356,7 @@ class Plotter(QtWidgets.QMainWindow):
 
         self.tree.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.tree.itemClicked.connect(self.itemClicked)
+        self.tree.itemExpanded.connect(self.itemExpanded)
         self.tree.customContextMenuRequested.connect(self.rightClick)
 
         plotter_config = load_config("plotter_config")
@@ -371,16 +385,7 @@ class Plotter(QtWidgets.QMainWindow):
         item.load(module)
         self.active_plugin_dict[item.nickname] = module
 
-        read_init_list = module._read_init_list
-        for mod in module._mod.values():
-            read_init_list.extend(mod._read_init_list)
-        for variable in read_init_list:
-            try:
-                variable()
-            except:
-                self.setStatus(
-                    f"Can't read variable {variable.address()} on instantiation",
-                    10000, False)
+        self.readInit(module)
         try:
             data = self.dataManager.getLastSelectedDataset().data
             data = data[[self.variable_x_comboBox.currentText(),
@@ -389,6 +394,25 @@ class Plotter(QtWidgets.QMainWindow):
         except Exception:
             pass
 
+    def itemExpanded(self, item):
+        """ Function called when an item is expanded in the tree.
+            Loads the submodule of the item on its first expansion """
+        if isinstance(item, TreeWidgetItemModule):
+            try:
+                if item.loadSubModule(): self.readInit(item.module)
+            except Exception as e:
+                self.setStatus(f"Can't load module {item.name}: {e}", 10000, False)
+
+    def readInit(self, module):
+        """ Reads the variables of module to be read on instantiation """
+        for variable in module._read_init_list:
+            try:
+                variable()
+            except:
+                self.setStatus(
+                    f"Can't read variable {variable.address()} on instantiation",
+                    10000, False)
+
     def getUniqueName(self, basename: str):
         """ This function adds a number next to basename in case this basename
         is already taken """
@@ -465,14 +489,55 @@ class Plotter(QtWidgets.QMainWindow):
     def autoRefreshChanged(self):
         """ Set if auto refresh call for device data """
         if self.auto_plotDataButton.isChecked():
-            self.timer.start()
+            self.startAcquisition()
         else:
-            self.timer.stop()
+            self.stopAcquisition()
+
+    def startAcquisition(self):
+        """ Start the thread reading the plotter variable """
+        self.stopAcquisition()
+        try:
+            variable_address = self.dataManager.get_variable_address()
+            variable = self.dataManager.getVariable(variable_address)
+        except Exception as e:
+            self.setStatus(f"Can't refresh data: {e}", 10000, False)
+            self.auto_plotDataButton.setChecked(False)
+            return None
+
+        self.acquisitionThread = AcquisitionThread(
+            variable, self.acquisitionQueue, self.timer_time)
+        self.acquisitionThread.errorSignal.connect(self.acquisitionError)
+        self.acquisitionThread.start()
+        self.timer.start()
+
+    def stopAcquisition(self):
+        """ Stop the thread reading the plotter variable """
+        self.timer.stop()
+        if self.acquisitionThread is not None:
+            self.acquisitionThread.stopFlag.set()
+            self.acquisitionThread.wait()
+            self.acquisitionThread = None
+        self.autoRefreshPlotData()  # display data still in queue
+
+    def acquisitionError(self, error: Exception):
+        """ Called if the variable can't be read by the acquisition thread """
+        self.setStatus(f"Can't refresh data: {error}", 10000, False)
+        self.auto_plotDataButton.setChecked(False)
+        self.stopAcquisition()
 
     def autoRefreshPlotData(self):
-        """ Function that refresh plot every timer interval """
-        # OPTIMIZE: timer should not call a heavy function, idealy just take data to plot
-        self.refreshPlotData()
+        """ Function that display the last data read by the acquisition thread """
+        data = None
+        while not self.acquisitionQueue.empty():
+            name, data = self.acquisitionQueue.get()
+
+        if data is None: return None
+
+        try:
+            dataset = self.dataManager.addDeviceData(name, data)
+            self.figureManager.start(dataset)
+        except Exception as e:
+            self.setStatus(f"Can't refresh data: {e}", 10000, False)
 
     def refreshPlotData(self, variable: Union[Variable, Variable_og, pd.DataFrame, Any] = None):
         """ This function get the last dataset data and display it onto the Plotter GUI """
@@ -498,6 +563,8 @@ class Plotter(QtWidgets.QMainWindow):
         else:
             # Rewrite the GUI with the current value
             self.updateDeviceValueGui()
+            if self.acquisitionThread is not None:
+                self.startAcquisition()
 
     def updateDeviceValueGui(self):
         """ This function ask the current value of the target value in the data
@@ -537,7 +604,10 @@ class Plotter(QtWidgets.QMainWindow):
 
     def closeEvent(self, event):
         """ This function does some steps before the window is closed (not killed) """
-        if hasattr(self, 'timer'): self.timer.stop()
+        if hasattr(self, 'timer'): self.stopAcquisition()
+        if self.dataManager.importThread is not None:
+            self.dataManager.importCancel()
+            self.dataManager.importThread.wait()
         self.timerPlugin.stop()
         self.timerQueue.stop()
 
@@ -566,6 +636,8 @@ class Plotter(QtWidgets.QMainWindow):
             value = float(self.delay_lineEdit.text())
             assert value >= 0
             self.timer_time = value
+            if self.acquisitionThread is not None:
+                self.acquisitionThread.delay = value
         except:
             pass
 
@@ -6,14 +6,24 @@ Created on Sun Sep 29 18:26:32 2019
 """
 
 import sys
+import time
 import inspect
-from typing import Any
+import hashlib
+import threading
+from queue import Queue
+from typing import Any, List, Union
 
+import numpy as np
+import pandas as pd
 from qtpy import QtCore, QtWidgets
 
 from ..GUI_utilities import qt_object_exists
 from ...devices import get_final_device_config, Device
 from ...drivers import load_driver_lib, get_driver
+from ...elements import Variable as Variable_og
+from ...variables import Variable
+from ...utilities import data_to_dataframe
+from ...io_scheduler import set_io_priority
 
 
 class ThreadManager:
@@ -142,3 +152,86 @@ class InteractionThread(QtCore.QThread):
                 if id(self.item) in self.item.gui.threadItemDict.keys():
                     self.item.gui.threadItemDict.pop(id(self.item))
         self.endSignal.emit(error)
+
+
+class ImportThread(QtCore.QThread):
+    """ This class is dedicated to import data files, in a new thread """
+    progressSignal = QtCore.Signal(object, object)
+    previewSignal = QtCore.Signal(object, object)
+    dataSignal = QtCore.Signal(object, object)
+    errorSignal = QtCore.Signal(object, object)
+
+    def __init__(self, filenames: List[str]):
+        super().__init__()
+        self.filenames = filenames
+        self.stopFlag = threading.Event()
+
+    def run(self):
+        """ Imports each file and sends the resulting DataFrame to the GUI """
+        from .data import importData  # inside to avoid circular import
+
+        for filename in self.filenames:
+            if self.stopFlag.is_set(): break
+            try:
+                data = importData(
+                    filename,
+                    progress=lambda value, f=filename: self.progressSignal.emit(f, value),
+                    preview=lambda data, f=filename: self.previewSignal.emit(f, data),
+                    stop_flag=self.stopFlag)
+            except Exception as e:
+                self.errorSignal.emit(filename, e)
+            else:
+                if data is not None:
+                    self.dataSignal.emit(filename, data)
+
+
+def data_digest(data: Union[np.ndarray, pd.DataFrame]) -> Union[tuple, None]:
+    """ Returns a fingerprint of the data buffer, or None if it can't be hashed """
+    columns = tuple(data.columns) if isinstance(data, pd.DataFrame) else None
+    try:
+        array = np.ascontiguousarray(data)
+        if array.dtype.hasobject: return None
+        digest = hashlib.blake2b(memoryview(array).cast('B'), digest_size=16).digest()
+    except (TypeError, ValueError):
+        return None
+    return (digest, array.shape, array.dtype.str, columns)
+
+
+class AcquisitionThread(QtCore.QThread):
+    """ This thread class is dedicated to read the plotter variable at a given delay,
+    and send its data to the GUI through a queue only if it changed """
+
+    errorSignal = QtCore.Signal(object)
+
+    def __init__(self, variable: Union[Variable, Variable_og], queue: Queue,
+                 delay: float):
+        super().__init__()
+        self.variable = variable
+        self.queue = queue
+        self.delay = delay
+
+        self.stopFlag = threading.Event()
+
+    def run(self):
+        set_io_priority('monitor')
+        name = self.variable.address()
+        last_digest = None
+
+        while not self.stopFlag.is_set():
+            start = time.time()
+            try:
+                value = self.variable()
+                if not isinstance(value, pd.DataFrame):
+                    value = np.asarray(value)
+
+                # Skip frame if same data than previous one
+                digest = data_digest(value)
+                if digest is None or digest != last_digest:
+                    last_digest = digest
+                    self.queue.put((name, data_to_dataframe(value, cache=False)))
+            except Exception as e:
+                self.errorSignal.emit(e)
+                break
+
+            # Wait remaining delay, stop as soon as requested
+            self.stopFlag.wait(max(self.delay - (time.time() - start), 0))
@@ -891,6 +891,10 @@ class ConfigManager:
 
         if len(var_to_save) != 0: configPars['variables'] = var_to_save
 
+        # Add derived columns to config
+        derived = self.gui.dataManager.derived
+        if len(derived) != 0: configPars['derived'] = dict(derived)
+
         return configPars
 
     def import_configPars(self, filename: str, append: bool = False):
@@ -920,7 +924,9 @@ class ConfigManager:
 
                 self.load_configPars(configPars, append=append)
 
-                if not self._got_error: self.addNewConfig()
+                if not self._got_error:
+                    self.addNewConfig()
+                    self.load_derived(configPars.get('derived', {}))
             else:
                 self.gui.setStatus(
                     f"Configuration file {filename} doesn't exists", 5000)
@@ -972,9 +978,9 @@ class ConfigManager:
 
             # Config
             config = OrderedDict()
-            # to remove 'autolab' and 'variables' from recipe list
+            # to remove 'autolab', 'variables' and 'derived' from recipe list
             recipeNameList = [i for i in list(configPars)
-                              if i not in ('autolab', 'variables')]
+                              if i not in ('autolab', 'variables', 'derived')]
 
             for recipe_num_name in recipeNameList:
 
@@ -1160,6 +1166,16 @@ class ConfigManager:
             self.configHistory.active = True
             self.update_loaded_devices(already_loaded_devices)
 
+    def load_derived(self, derived: Dict[str, str]):
+        """ Adds the derived columns of an imported configuration. Not done
+        by load_configPars to keep them on undo and redo """
+        for name, expression in derived.items():
+            try:
+                self.gui.dataManager.setDerivedColumn(name, expression)
+            except Exception as e:
+                self.gui.setStatus(
+                    f"Can't add derived column {name}: {e}", 10000, False)
+
     # UNDO REDO ACTIONS
     ###########################################################################
 
@@ -12,15 +12,16 @@ import shutil
 import tempfile
 import sys
 import random
-from typing import List, Union
+from typing import List, Union, Dict
 
 import numpy as np
 import pandas as pd
-from qtpy import QtCore, QtWidgets
+from qtpy import QtWidgets
 
+from ..GUI_scheduler import RenderTimer
 from ...config import get_scanner_config
-from ...utilities import boolean, create_array, data_to_dataframe
-from ...variables import has_eval, eval_safely
+from ...utilities import boolean, create_array, data_to_dataframe, clean_string
+from ...variables import has_eval, eval_safely, compile_eval, allowed_dict, EVAL
 
 
 class DataManager:
@@ -31,14 +32,15 @@ class DataManager:
         self.gui = gui
         self.datasets = []
         self.queue = Queue()
+        self.derived = {}  # name: expression of the derived columns
+        self._derived_errors = set()  # names of the columns with reported error
+
 
         scanner_config = get_scanner_config()
         self.save_temp = boolean(scanner_config["save_temp"])
 
         # Timer
-        self.timer = QtCore.QTimer(self.gui)
-        self.timer.setInterval(33) #30fps
-        self.timer.timeout.connect(self.sync)
+        self.timer = RenderTimer(self.gui, self.sync, 33)  # 30fps max
 
     def getData(self, nbDataset: int, var_list: List[str],
                 selectedData: int = 0, data_name: str = "Scan",
@@ -127,6 +129,7 @@ class DataManager:
 
                 dataset = Dataset(sub_folder, recipe_name,
                                   config, save_temp=self.save_temp)
+                dataset.setDerived(self.derived)
                 scanset[recipe_name] = dataset
 
                 # bellow just to know maximum point
@@ -186,6 +189,7 @@ class DataManager:
         lenQueue = self.queue.qsize()
 
         # Add scan data to dataset
+        updated_datasets = []
         for _ in range(lenQueue):
             try: point = self.queue.get()  # point is collections.OrderedDict{0:recipe_name, 'parameter_name':parameter_value, 'step1_name':step1_value, 'step2_name':step2_value, ...}
             except: break
@@ -193,8 +197,13 @@ class DataManager:
             recipe_name = list(point.values())[0]
             dataset = scanset[recipe_name]
             dataset.addPoint(point)
+            if dataset not in updated_datasets: updated_datasets.append(dataset)
             count += 1
 
+        # Derived columns of the new points, computed at once
+        for dataset in updated_datasets:
+            self._updateDerived(dataset)
+
         # Upload the plot if new data available
         if count > 0:
             # Update progress bar
@@ -212,6 +221,50 @@ class DataManager:
             # Update plot
             self.gui.figureManager.data_comboBoxClicked()
 
+    def setDerivedColumn(self, name: str, expression: str = None):
+        """ Adds a derived column to the datasets, computed from the other
+        columns by the python expression (like '$eval:' with the columns as
+        numpy arrays), or removes it if expression is None """
+        name = clean_string(name)
+        assert name != '', "Derived column name cannot be empty"
+
+        if expression is None:
+            self.derived.pop(name, None)
+        else:
+            assert name not in self._resultNames(), f"Name '{name}' is already used by a scan result"
+            if not has_eval(expression): expression = EVAL + expression
+            compile_eval(expression)  # raises SyntaxError before storing
+            self.derived[name] = expression
+        self._derived_errors.discard(name)
+
+        for scanset in self.datasets:
+            for dataset in scanset.values():
+                dataset.setDerived(self.derived)
+                self._updateDerived(dataset)
+
+        self.updateDisplayableResults()
+        self.gui.figureManager.reloadData()
+
+    def _resultNames(self) -> List[str]:
+        """ Returns the names of the parameters and steps of the current
+        recipes and of the columns of the existing datasets """
+        names = ['id']
+        for recipe_name in self.gui.configManager.recipeNameList():
+            names += self.gui.configManager.getNames(recipe_name)
+        for scanset in self.datasets:
+            for dataset in scanset.values():
+                names += dataset.header
+        return names
+
+    def _updateDerived(self, dataset):
+        """ Updates the derived columns of dataset and reports errors once """
+        errors = dataset.updateDerived()
+        for name, error in errors.items():
+            if name in self._derived_errors: continue
+            self._derived_errors.add(name)
+            self.gui.setStatus(
+                f"Can't compute derived column {name}: {error}", 10000, False)
+
     def updateDisplayableResults(self):
         """ This function update the combobox in the GUI that displays the names of
         the results that can be plotted """
@@ -336,6 +389,61 @@ class Dataset():
                        )
         self.data = pd.DataFrame(columns=self.header)
 
+        # Derived columns, computed from the others after acquisition
+        self.derived = {}  # name: expression
+        self._derived_values = {}  # name: np.ndarray
+        self._derived_len = 0
+
+    def setDerived(self, derived: Dict[str, str]):
+        """ Sets the derived columns {name: '$eval:expression'}, computed for
+        the existing points on the next updateDerived """
+        for name in self.derived:
+            if name in self.data.columns and name not in self.header:
+                self.data = self.data.drop(columns=name)
+        self.derived = {name: expression for name, expression in derived.items()
+                        if name not in self.header}
+        self._derived_values = {name: np.array([]) for name in self.derived}
+        self._derived_len = 0
+
+    def updateDerived(self) -> Dict[str, str]:
+        """ Computes the derived columns for the points added since the last
+        call. Each expression is evaluated once for all these points, with the
+        columns as numpy arrays, so element-wise expressions are expected.
+        Returns the errors by derived column name """
+        errors = {}
+        if len(self.derived) == 0: return errors
+
+        start = self._derived_len
+        nb_new = len(self.data) - start
+
+        if nb_new > 0:
+            namespace = dict(allowed_dict)
+            for i, name in enumerate(self.header):
+                namespace[name] = self.data.iloc[start:, i].to_numpy()
+
+            for name, expression in self.derived.items():
+                try:
+                    values = np.asarray(
+                        eval(compile_eval(expression), {}, namespace), dtype=float)
+                    if values.ndim == 0:
+                        values = np.full(nb_new, values)
+                    assert values.shape == (nb_new, ), f"Expected {nb_new} values, got shape {values.shape}"
+                except Exception as e:
+                    errors[name] = e
+                    values = np.full(nb_new, np.nan)
+
+                namespace[name] = values  # usable by the next derived columns
+                self._derived_values[name] = np.concatenate(
+                    (self._derived_values[name], values))
+
+            self._derived_len = len(self.data)
+
+        # data is rebuilt by addPoint
+        for name, values in self._derived_values.items():
+            self.data[name] = values
+
+        return errors
+
     def getData(self, var_list: List[str], data_name: str = "Scan",
                 dataID: int = 0, filter_condition: List[dict] = []) -> pd.DataFrame:
         """ This function returns a dataframe with two columns : the parameter value,
@@ -361,7 +469,7 @@ class Dataset():
                         and var_filter['name'] is not None):
                     var_list.append(var_filter['name'])
                 elif isinstance(var_filter['condition'], str):
-                    for key in self.header:
+                    for key in self.header + list(self.derived):
                         if key in var_filter['condition']:
                             var_list.append(key)
 
@@ -399,7 +507,8 @@ class Dataset():
         if os.path.exists(data_name):
             shutil.copy(data_name, filename)
         else:
-            self.data.to_csv(filename, index=False, header=self.header)
+            self.data.iloc[:, :len(self.header)].to_csv(
+                filename, index=False, header=self.header)
 
         if self.folders:
             if not os.path.exists(dataset_folder): os.mkdir(dataset_folder)
@@ -95,6 +95,19 @@ class Scanner(QtWidgets.QMainWindow):
         variablesMenuAction.triggered.connect(lambda: openVariablesMenu(True))
         variablesMenuAction.setStatusTip("Open the variable menu in another window")
 
+        # Derived columns menu
+        dataMenu = self.menuBar.addMenu('Data')
+
+        addDerivedAction = dataMenu.addAction('Add derived column')
+        addDerivedAction.setIcon(icons['add'])
+        addDerivedAction.triggered.connect(self.addDerivedColumnClicked)
+        addDerivedAction.setStatusTip(
+            "Add a column computed from the scan results, for example 'power_mW = power*1e3'")
+
+        self.removeDerivedMenu = dataMenu.addMenu('Remove derived column')
+        self.removeDerivedMenu.setIcon(icons['remove'])
+        self.removeDerivedMenu.aboutToShow.connect(self.populateRemoveDerived)
+
         self.configManager.addRecipe("recipe")  # add one recipe by default
         self.configManager.undoClicked() # avoid false history
         self.setStatus("")
@@ -129,6 +142,31 @@ class Scanner(QtWidgets.QMainWindow):
             obj.setStyleSheet("background-color: #DDDDDD;")  # Normal color
         return super().eventFilter(obj, event)
 
+    def addDerivedColumnClicked(self):
+        """ Asks a derived column definition 'name = expression' and adds it
+        to the datasets """
+        text, ok = QtWidgets.QInputDialog.getText(
+            self, 'Add derived column',
+            'Definition (name = expression of the result columns):',
+            text='name = ')
+        if not ok: return None
+
+        try:
+            assert '=' in text, "Definition must be 'name = expression'"
+            name, expression = text.split('=', 1)
+            self.dataManager.setDerivedColumn(name.strip(), expression.strip())
+        except Exception as e:
+            self.setStatus(f"Can't add derived column: {e}", 10000, False)
+
+    def populateRemoveDerived(self):
+        """ Lists the derived columns in the remove menu """
+        self.removeDerivedMenu.clear()
+        for name, expression in self.dataManager.derived.items():
+            action = QtWidgets.QAction(f'{name} = {expression}', self)
+            action.triggered.connect(
+                partial(self.dataManager.setDerivedColumn, name, None))
+            self.removeDerivedMenu.addAction(action)
+
     def populateOpenRecent(self):
         """ https://realpython.com/python-menus-toolbars/#populating-python-menus-dynamically """
         self.openRecentMenu.clear()
@@ -20,6 +20,7 @@ from ..GUI_utilities import qt_object_exists, MyInputDialog, MyFileDialog
 from ..GUI_instances import instances
 from ...paths import PATHS
 from ...variables import eval_variable, set_variable, has_eval
+from ...io_scheduler import set_io_priority
 from ...utilities import create_array
 
 
@@ -354,6 +355,9 @@ class ScanThread(QtCore.QThread):
         self.user_response = None
 
     def run(self):
+        # Scan calls to devices are served first
+        set_io_priority('scan')
+
         # Start the scan
         for recipe_name in self.config:
             if self.config[recipe_name]['active']: self.execRecipe(recipe_name)
@@ -421,7 +425,7 @@ class ScanThread(QtCore.QThread):
 
                         # Set the parameter value
                         self.startParameterSignal.emit(recipe_name, param_name)
-                        if element is not None: element(paramValue)
+                        if element is not None: element.fast_write(paramValue)
                         self.finishParameterSignal.emit(recipe_name, param_name)
 
                         initPointStep[param_name] = paramValue
@@ -495,13 +499,13 @@ class ScanThread(QtCore.QThread):
         result = None
 
         if stepType == 'measure':
-            result = element()
+            result = element.fast_read()
             set_variable(stepInfos['name'], result)
         elif stepType == 'set':
             value = eval_variable(stepInfos['value'])
             if element.type in [bytes] and isinstance(value, str): value = value.encode()
             if element.type in [np.ndarray]: value = create_array(value)
-            element(value)
+            element.fast_write(value)
         elif stepType == 'action':
             if stepInfos['value'] is not None:
                 # Open dialog for open file, save file or input text
@@ -2,10 +2,8 @@
 import sys
 
 from .config import get_device_config
-from .drivers import (update_drivers_paths, DRIVERS_PATHS, get_driver_category,
-                      load_driver_lib, get_connection_names, get_class_args,
-                      get_connection_class, get_driver_class, get_module_names,
-                      get_module_class)
+from .drivers import (update_drivers_paths, DRIVERS_PATHS, get_drivers_infos,
+                      get_driver_metadata)
 from .paths import DRIVER_SOURCES
 from .utilities import two_columns, emphasize, underline
 from .devices import list_devices, list_loaded_devices, get_final_device_config
@@ -22,13 +20,15 @@ def _list_drivers(_print: bool = True) -> str:
     s = '\n'
     s += f'{len(DRIVERS_PATHS)} drivers found\n\n'
 
+    drivers_infos = get_drivers_infos(list(DRIVERS_PATHS))
+
     for i, (source_name, source) in enumerate(DRIVER_SOURCES.items()):
         sub_driver_list = sorted([key for key, val in DRIVERS_PATHS.items(
             ) if val['source'] == source_name])
         s += f'Drivers in {source}:\n'
         if len(sub_driver_list) > 0:
             txt_list = [[f' - {driver_name}',
-                         f'({get_driver_category(driver_name)})']
+                         f"({drivers_infos[driver_name]['category']})"]
                             for driver_name in sub_driver_list]
             s += two_columns(txt_list) + '\n\n'
         else:
@@ -86,27 +86,24 @@ def config_help(driver_name: str, _print: bool = True, _parser: bool = False) ->
         driver_name = get_final_device_config(driver_name)["driver"]
     except:
         pass
-    # Load list of all parameters
+    # Load list of all parameters, without executing the driver
     try:
-        driver_lib = load_driver_lib(driver_name)
+        metadata = get_driver_metadata(driver_name)
     except Exception as e:
         print(f"Can't load {driver_name}: {e}", file=sys.stderr)
         return None
     params = {}
     params['driver'] = driver_name
-    params['connection'] = {}
-    for conn in get_connection_names(driver_lib):
-        params['connection'][conn] = get_class_args(
-            get_connection_class(driver_lib, conn))
-    params['other'] = get_class_args(get_driver_class(driver_lib))
-    if hasattr(get_driver_class(driver_lib), 'slot_config'):
-        params['other']['slot1'] = f'{get_driver_class(driver_lib).slot_config}'
+    params['connection'] = {conn: dict(args) for conn, args in metadata['connections'].items()}
+    params['other'] = dict(metadata['driver_args'])
+    if metadata['slot_config'] is not None:
+        params['other']['slot1'] = metadata['slot_config']
         params['other']['slot1_name'] = 'my_<MODULE_NAME>'
 
     mess = '\n'
 
     # Name and category if available
-    submess = f'Driver "{driver_name}" ({get_driver_category(driver_name)})'
+    submess = f'Driver "{driver_name}" ({metadata["category"]})'
     mess += emphasize(submess, sign='=') + '\n'
 
     # Connections types
@@ -117,13 +114,11 @@ def config_help(driver_name: str, _print: bool = True, _parser: bool = False) ->
     mess += '\n'
 
     # Modules
-    if hasattr(get_driver_class(driver_lib), 'slot_config'):
+    if metadata['slot_config'] is not None:
         mess += 'Available modules:\n'
-        modules = get_module_names(driver_lib)
-        for module in modules:
-            moduleClass = get_module_class(driver_lib, module)
+        for module, category in metadata['modules'].items():
             mess += f' - {module}'
-            if hasattr(moduleClass, 'category'): mess += f' ({moduleClass.category})'
+            if category is not None: mess += f' ({category})'
             mess += '\n'
         mess += '\n'
 
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+import itertools
+from typing import Callable, List
+
+
+# Order in which the threads waiting for a device are served
+PRIORITIES = {'scan': 0, 'monitor': 1, 'gui': 2}
+
+_local = threading.local()
+
+
+def set_io_priority(priority: str):
+    """ Sets the priority of the device calls made by the current thread,
+    among 'scan', 'monitor' and 'gui' (default) """
+    assert priority in PRIORITIES, f"Unknown io priority '{priority}', use one of {list(PRIORITIES)}"
+    _local.priority = priority
+
+
+def get_io_priority() -> str:
+    """ Returns the priority of the device calls made by the current thread """
+    return getattr(_local, 'priority', 'gui')
+
+
+class _Waiter():
+    """ Thread waiting for the access to a device """
+
+    __slots__ = ('level', 'ticket', 'start', 'event', 'tried')
+
+    def __init__(self, level: int, ticket: int):
+        self.level = level
+        self.ticket = ticket
+        self.start = time.monotonic()
+        self.event = threading.Event()  # set when it is its turn
+        self.tried = threading.Event()  # set when it tried to take its turn
+
+
+class DeviceIOScheduler():
+    """ Serializes the calls to the driver of a device made from several threads
+    (scan, monitors, control panel, plotter).
+    When the device is busy, the waiting threads are served by priority
+    (scan > monitor > gui, see set_io_priority) and in arrival order for the
+    same priority. A thread gains one priority level each aging seconds waited,
+    so that a running scan doesn't block the monitors and the GUI.
+    Can be acquired several times by the same thread.
+    The device access is a C RLock: acquire is a non-blocking acquire of this
+    lock, the priorities are only used by the threads that had to wait. A
+    thread releasing the device while threads wait hands it over to the next
+    one before returning, so that it can't take it back right away. """
+
+    __slots__ = ('_device_lock', '_lock', '_waiters', '_tickets')
+
+    aging = 0.5  # s
+
+    def __init__(self):
+        self._device_lock = threading.RLock()  # held by the thread using the device
+        self._lock = threading.Lock()  # protects the waiters
+        self._waiters: List[_Waiter] = []
+        self._tickets = itertools.count()
+
+    def acquire(self):
+        """ Waits for the access to the device """
+        if not self._device_lock.acquire(False): self._wait()
+
+    def release(self):
+        """ Gives the access to the device to the next waiting thread """
+        self._device_lock.release()
+        if self._waiters: self._hand_over()
+
+    def guard(self, function: Callable) -> Callable:
+        """ Returns function called with the access to the device, same as
+        using the scheduler as context manager but inlined, used for the
+        variable reads and writes """
+        acquire = self._device_lock.acquire
+        release = self._device_lock.release
+        waiters = self._waiters
+
+        def guarded_function(*args):
+            if not acquire(False): self._wait()
+            try:
+                return function(*args)
+            finally:
+                release()
+                if waiters: self._hand_over()
+
+        return guarded_function
+
+    __enter__ = acquire
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def _wait(self):
+        """ Waits for the device held by another thread, by priority """
+        with self._lock:
+            waiter = _Waiter(PRIORITIES[get_io_priority()], next(self._tickets))
+            self._waiters.append(waiter)
+
+        # Woken by release when it is the next waiter to serve
+        while True:
+            with self._lock:
+                if (self._next_waiter() is waiter
+                        and self._device_lock.acquire(False)):
+                    self._waiters.remove(waiter)
+                    waiter.tried.set()
+                    return None
+                waiter.event.clear()
+                waiter.tried.set()
+            waiter.event.wait(self.aging)
+
+    def _hand_over(self):
+        """ Wakes the waiter to serve first and waits until it tried to take
+        the device (it can't if the device was released by a nested call) """
+        with self._lock:
+            waiter = self._next_waiter()
+            if waiter is None: return None
+            waiter.tried.clear()
+            waiter.event.set()
+        waiter.tried.wait(self.aging)
+
+    def _next_waiter(self) -> _Waiter:
+        """ Returns the waiter to serve first, None if no thread waits """
+        if len(self._waiters) == 0: return None
+        now = time.monotonic()
+        return min(self._waiters, key=lambda waiter: (
+            waiter.level - (now - waiter.start) / self.aging, waiter.ticket))
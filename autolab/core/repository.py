@@ -10,14 +10,15 @@ import sys
 import zipfile
 import tempfile
 import shutil
-import urllib.request
 import json
 from typing import Union, Tuple
 
 from .paths import DRIVER_SOURCES, DRIVER_REPOSITORY
-from .drivers import update_drivers_paths
+from .drivers import rescan_drivers
 from .utilities import input_wrap
-from .gitdir import download
+
+# urllib.request and gitdir are imported when downloading, not needed to
+# import autolab
 
 
 def _format_url(url: str):
@@ -39,6 +40,7 @@ def _download_repo(url: str, output_dir: str):
     except:
         print("Package tqdm or requests not found, can't display download progression")
         print(f"Downloading {url}")
+        import urllib.request
         with urllib.request.urlopen(url) as github_repo_zip:
             with open(output_dir, 'wb') as repo_zip:
                 repo_zip.write(github_repo_zip.read())
@@ -181,7 +183,7 @@ def install_drivers(*repo_url: Union[None, str, Tuple[str, str]],
     os.rmdir(temp_repo_folder)
 
     # Update available drivers
-    update_drivers_paths()
+    rescan_drivers()
 
 
 # =============================================================================
@@ -203,6 +205,7 @@ def _get_drivers_list_from_github(url):
     else:
         url_api += '/git/trees/master'
 
+    import urllib.request
     with urllib.request.urlopen(url_api) as f:
         html = json.load(f)
 
@@ -223,6 +226,7 @@ def _download_driver(url, driver_name, output_dir, _print=True):
         driver_url = driver_url + "/" + driver_name
         # Too slow to be used for full repo, only use it for one or 2 drivers
         # 'HTTP Error 403: rate limit exceeded' due to too much download if don't have github account
+        from .gitdir import download
         download(driver_url, output_dir=output_dir, _print=_print)
     except:  # if use Exception, crash python when having error
         e = f"Error when downloading driver '{driver_name}'"
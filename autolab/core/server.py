@@ -1,227 +1,542 @@
 # -*- coding: utf-8 -*-
 
+import sys
+import time
 import socket
+import struct
 import pickle
+import asyncio
 import threading
+import itertools
+import collections
 import datetime as dt
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import numpy as np
 
 from .config import get_server_config
-from .devices import get_devices_status, get_device
+from .devices import get_devices_status, get_device, get_element_by_address
 
 
-class Driver_SOCKET():
+# Large contiguous arrays (numpy, pandas) are sent out of the pickle, straight
+# from their memory, with the pickle protocol 5 (python >= 3.8)
+OUT_OF_BAND = pickle.HIGHEST_PROTOCOL >= 5
+IOV_MAX = 1024  # maximal number of buffers sent in one sendmsg call
 
-    prefix = b'<AUTOLAB_START>'
-    suffix = b'<AUTOLAB_END>'
 
-    def read(self, length=4096):
-        ''' Read pickled object from autolab master and return python object '''
-        # First read
-        msg  = self.socket.recv(length)
-        assert msg != b'', 'Connection closed by remote host'
-        assert msg.startswith(self.prefix), 'Autolab communication structure not found in reply'
+def encode_message(request_id: int, object) -> list:
+    ''' Returns the parts of the message of a python object: the header, the
+    pickled object and the raw memory of its large arrays, not copied '''
+    buffers = []
 
-        # Continue reading up to suffix
-        while not msg.endswith(self.suffix):
-            msg += self.socket.recv(length)
+    if OUT_OF_BAND:
+        def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+            # Small arrays are kept in the pickle (True)
+            raw = buffer.raw()
+            if raw.nbytes < Driver_SOCKET.out_of_band_size: return True
+            buffers.append(raw)
+            return False
+        payload = pickle.dumps(object, protocol=5, buffer_callback=buffer_callback)
+    else:
+        payload = pickle.dumps(object, protocol=pickle.HIGHEST_PROTOCOL)
 
-        # Clean msg (remove prefix and suffix) and unpicke it
-        msg = msg.lstrip(self.prefix).rstrip(self.suffix)
-        obj = pickle.loads(msg)
+    header = Driver_SOCKET.header.pack(request_id, len(payload), len(buffers))
+    if buffers:
+        header += struct.pack(f'!{len(buffers)}Q', *[raw.nbytes for raw in buffers])
 
-        return obj
+    return [header, payload] + buffers
 
-    def write(self, object):
-        ''' Send pickled object to autolab master '''
-        msg = self.prefix + pickle.dumps(object) + self.suffix
-        self.socket.send(msg)
 
+def decode_message(payload, buffers: list):
+    ''' Returns the python object of a message from its pickled object and
+    the memory of its out of band arrays, used without copy '''
+    if buffers: return pickle.loads(payload, buffers=buffers)
+    return pickle.loads(payload)
 
-class ClientThread(threading.Thread, Driver_SOCKET):
 
-    def __init__(self, client_socket, server):
-        super().__init__()
-        self.socket = client_socket
-        self.server = server
-        self.stop_flag = threading.Event()
-        self.hostname = None
-
-    def run(self):
+class Driver_SOCKET():
+    ''' Framed transport of pickled objects. Each message is:
+    - a header with the request id, the payload length and the number N of
+      out of band buffers, followed by the N buffer lengths,
+    - the pickled object,
+    - the N buffers: raw memory of the large arrays of the object, sent from
+      the array memory and received directly in the memory of the new array '''
+
+    header = struct.Struct('!IQI')  # request id, payload length, number of buffers
+    small_message = 65536  # header and payload sent in one call below this size
+    out_of_band_size = 65536  # arrays larger than this are sent out of band
+
+    _buffer = bytearray(0)  # reception buffer, reused and grown if needed
+
+    def _recv_into(self, view: memoryview):
+        ''' Fill view with the received bytes '''
+        size = len(view)
+        received = 0
+        while received < size:
+            nbytes = self.socket.recv_into(view[received: ], size - received)
+            assert nbytes != 0, 'Connection closed by remote host'
+            received += nbytes
+
+    def _recv_exactly(self, size: int) -> memoryview:
+        ''' Receive size bytes in the reception buffer '''
+        if len(self._buffer) < size:
+            self._buffer = bytearray(max(size, 2*len(self._buffer)))
+        view = memoryview(self._buffer)[: size]
+        self._recv_into(view)
+        return view
+
+    def _send_parts(self, parts: list):
+        ''' Send the parts of a message, in one system call if possible '''
+        if len(parts[1]) < self.small_message:
+            parts = [parts[0] + parts[1]] + parts[2: ]
+        if len(parts) == 1 or not hasattr(self.socket, 'sendmsg'):  # Windows
+            for part in parts:
+                self.socket.sendall(part)
+            return None
+
+        parts = [memoryview(part) for part in parts if len(part) != 0]
+        while parts:
+            sent = self.socket.sendmsg(parts[: IOV_MAX])
+            # Skip the parts sent, sendmsg may stop in the middle of one
+            while parts and sent >= len(parts[0]):
+                sent -= len(parts.pop(0))
+            if sent != 0: parts[0] = parts[0][sent: ]
+
+    def read_frame(self) -> tuple:
+        ''' Read one message, returns its request id and python object '''
+        request_id, length, nb_buffers = self.header.unpack(
+            self._recv_exactly(self.header.size))
+        if nb_buffers == 0:
+            return request_id, pickle.loads(self._recv_exactly(length))
+
+        lengths = struct.unpack(f'!{nb_buffers}Q', self._recv_exactly(8*nb_buffers))
+        payload = self._recv_exactly(length)
+
+        # Arrays memory, given to the unpickled arrays
+        buffers = []
+        for size in lengths:
+            buffer = bytearray(size)
+            self._recv_into(memoryview(buffer))
+            buffers.append(buffer)
+
+        return request_id, decode_message(payload, buffers)
+
+    def write_frame(self, request_id: int, object):
+        ''' Send python object as one message with request id '''
+        self._send_parts(encode_message(request_id, object))
+
+    def read(self):
+        ''' Read pickled object from autolab master and return python object '''
+        return self.read_frame()[1]
 
-        # Handshaking
-        if self.handshake():
-            # Start listening client commands
-            self.listen()
+    def write(self, object):
+        ''' Send pickled object to autolab master '''
+        self.write_frame(0, object)
 
-        # Close client socket
-        self.close()
 
-    def handshake(self) -> bool:
+def execute_command(command: dict):
+    ''' Execute an element command on the local devices and returns its
+    result. command is {'command': 'read'|'write'|'execute', 'address': str}
+    with a 'value' key to write or to execute an action with a parameter '''
+    element = get_element_by_address(command['address'])
 
-        ''' Check that incoming connection comes from another Autolab program,
-            and that no thread is already controlling autolab '''
+    if command['command'] == 'read':
+        return element()
+    if command['command'] in ('write', 'execute'):
+        if 'value' in command: return element(command['value'])
+        return element()
 
-        self.socket.settimeout(2)
+    raise ValueError(f"Unknown command '{command['command']}'")
 
-        try :
-            # Read first command from client
-            handshake_str = self.read()
 
-            # Check that first client command is 'AUTOLAB?'
-            if handshake_str.startswith('AUTOLAB?'):
+def values_equal(value1, value2) -> bool:
+    ''' Returns True if two values read are the same, used to push only the
+    changes of a variable '''
+    if type(value1) is not type(value2): return False
+    if hasattr(value1, 'equals'): return value1.equals(value2)  # pandas
+    if isinstance(value1, np.ndarray): return np.array_equal(value1, value2)
+    try: return bool(value1 == value2)
+    except Exception: return False
 
-                self.hostname = handshake_str.split('=')[1]
 
-                # There is no main thread currently running, accepting communication
-                if self.server.active_connection_thread is None:
-                    self.server.active_connection_thread = self
-                    self.server.log(f'Host "{self.hostname}" connected')
-                    self.write('YES')
-                    result = True
+class _Subscriber():
+    ''' Subscription of a client to the values of a variable '''
 
-                # Another client is controlling autolab, reply that the server is busy, refusing communication
-                else :
-                    self.server.log(f'Host "{self.hostname}" trying to connect but a connection is already established from host "{self.server.active_connection_thread.hostname}"')
-                    self.write(f'A connection to the Autolab server is already established from host "{self.server.active_connection_thread.hostname}".')
-                    result = False
+    __slots__ = ('session', 'id', 'address', 'interval', 'on_change',
+                 'last_push', 'last_value')
 
-            # The client did not ask the right first command, refusing communication
-            else: result = False
+    def __init__(self, session, command: dict):
+        self.session = session
+        self.id = command['id']
+        self.address = command['address']
+        self.interval = float(command.get('interval', 0.1))
+        self.on_change = bool(command.get('on_change', False))
+        assert self.interval >= 0, f'Subscription interval must be positive, not {self.interval}'
+        self.last_push = -float('inf')
+        self.last_value = None
 
-        except Exception as e:
-            print(e)
-            result = False
+    def push(self, status: str, timestamp: float, value, now: float,
+             sampling_interval: float):
+        ''' Send a sampled value if the subscriber interval is elapsed, and if
+        the value changed for an on change subscription '''
+        # Half a sampling interval of tolerance for the sampling jitter
+        if now - self.last_push < self.interval - sampling_interval / 2: return None
+        if (self.on_change and status == 'update' and self.last_push != -float('inf')
+                and values_equal(value, self.last_value)): return None
 
-        self.socket.settimeout(None)
+        if self.session.push((status, self.id, timestamp, value)):
+            self.last_push = now
+            if self.on_change: self.last_value = value
 
-        return result
 
-    def listen(self):
-        ''' Listen and answer client commands '''
-        while not self.stop_flag.is_set():
-            try:
-                command = self.read()
-                self.process_command(command)
-            except:
-                self.stop_flag.set()
+class ClientSession():
+    ''' Connection of one client to the server '''
 
-    def process_command(self, command):
-        ''' Process given client command '''
+    def __init__(self, server, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.hostname = None
+        self.subscriptions = {}  # subscription id: _Subscriber
+
+        # Rate limiting (token bucket)
+        self.tokens = server.rate_limit
+        self.last_request = time.monotonic()
+
+    async def read_frame(self) -> tuple:
+        ''' Read one message, returns its request id and python object '''
+        header = Driver_SOCKET.header
+        request_id, length, nb_buffers = header.unpack(
+            await self.reader.readexactly(header.size))
+        lengths = struct.unpack(
+            f'!{nb_buffers}Q', await self.reader.readexactly(8*nb_buffers))
+        payload = await self.reader.readexactly(length)
+        # Not copied to be writable: the arrays are read-only, the elements
+        # copy them (np.array) before writing them to the devices
+        buffers = [await self.reader.readexactly(size) for size in lengths]
+        return request_id, decode_message(payload, buffers)
+
+    async def write_frame(self, request_id: int, object):
+        ''' Send python object as one message with request id '''
+        self.writer.writelines(encode_message(request_id, object))
+        await self.writer.drain()
+
+    def push(self, message) -> bool:
+        ''' Send a message not answering a request (request id 0). The message
+        is dropped if the client doesn't receive the previous ones fast
+        enough. Returns True if sent '''
+        if self.writer.is_closing() or self.writer.transport.get_write_buffer_size() > 0:
+            return False
+        self.writer.writelines(encode_message(0, message))
+        return True
+
+    async def run(self):
+        try:
+            # Handshaking
+            if await self.handshake():
+                # Start listening client commands
+                await self.listen()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            self.server.log(f'Host "{self.hostname}" error: {e}')
+        finally:
+            self.close()
+
+    async def handshake(self) -> bool:
+        ''' Check that incoming connection comes from another Autolab program '''
+        request_id, handshake_str = await asyncio.wait_for(self.read_frame(), 2)
+
+        # Check that first client command is 'AUTOLAB?'
+        if not (isinstance(handshake_str, str) and handshake_str.startswith('AUTOLAB?')):
+            return False
+
+        self.hostname = handshake_str.split('=')[1]
+        self.server.log(f'Host "{self.hostname}" connected')
+        await self.write_frame(request_id, 'YES')
+        return True
+
+    async def listen(self):
+        ''' Listen and answer client commands. The answers are sent in the
+        order of the requests, with the same request id, so a client can send
+        several requests before reading the answers '''
+        while True:
+            request_id, command = await self.read_frame()
+            if command == 'CLOSE_CONNECTION': return None
+            answer = await self.process_command(command)
+            await self.write_frame(request_id, answer)
+
+    async def process_command(self, command):
+        ''' Process given client command, returns the answer. The answer of
+        dict commands is ('ok', result) or ('error', message) '''
         if isinstance(command, str):
-            if command == 'CLOSE_CONNECTION':
-                self.stop_flag.set()
-            elif command == 'DEVICES_STATUS?':
-                return self.write(get_devices_status())
-        else:
-            if command['command'] == 'get_device_model':
-                device_name = command['device_name']
-                structure = get_device(device_name).get_structure()
-                self.write(structure)
-            elif command['command'] == 'request':
-                get_device(device_name).get_by_adress(command['element_adress'])
-                # element_address --> my_yenista::submodule::wavelength
-                wavelength()
-
-#command_dict = {'command':'get_driver_model','name':self.name}
-
-    def close(self):
+            if command == 'DEVICES_STATUS?':
+                return get_devices_status()
+            return None
 
-        # In case the close call come from outside of the threading
-        self.socket.close()
-
-        # If this thread is the main client thread, remove declaration
-        if self.server.active_connection_thread == self:
-            self.server.log(f'Host "{self.hostname}" disconnected')
-            self.server.active_connection_thread = None
+        if command['command'] == 'batch':
+            # Several commands in one request, executed in order
+            return ('ok', [await self.process_command(sub_command)
+                           for sub_command in command['commands']])
 
-    def request_close(self):
+        await self.throttle()
+        try:
+            result = await self.server.execute(self, command)
+        except Exception as e:
+            return ('error', f'{e.__class__.__name__}: {e}')
+        return ('ok', result)
+
+    async def throttle(self):
+        ''' Waits if the client sends more than rate_limit commands per second '''
+        rate = self.server.rate_limit
+        if rate <= 0: return None
+
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.last_request) * rate)
+        self.last_request = now
+        if self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / rate)
+            self.tokens = 1
+            self.last_request = time.monotonic()
+        self.tokens -= 1
 
-        self.stop_flag.set()
-        self.socket.shutdown(socket.SHUT_RDWR)
-        self.join()
+    def close(self):
+        ''' Close the client connection, release its write leases and
+        subscriptions '''
+        self.writer.close()
+        self.server.remove_session(self)
 
 
 class Server():
+    ''' Autolab server giving access to the local devices to remote Autolab
+    clients (see Driver_REMOTE). Several clients can be connected at once:
+    - reads are shared: simultaneous reads of a variable make one device read,
+      whose value is kept max_age seconds for the next reads,
+    - writes and actions on a device are reserved to one client, which holds
+      a write lease on the device while it used it in the last lease_time
+      seconds (or until released with the 'release' command),
+    - a client can subscribe to a variable with the 'subscribe' command, to
+      receive its values without request: the variable is read once for all
+      its subscribers, at the smallest of their intervals, and the values
+      are pushed with the request id 0 (see Driver_REMOTE.subscribe),
+    - each client is limited to rate_limit commands per second.
+    These parameters are set in the server section of autolab_config.ini '''
 
     def __init__(self, port=None):
 
-        self.client_threads = []
-        self.active_connection_thread = None
+        self.sessions = []
 
         # Load server config in autolab_config.ini
         server_config = get_server_config()
         if not port: port = int(server_config['port'])
         self.port = port
-
-        # Start the server
-        self.start()
-
-        # Start listening
-        try: self.listen()
-        except: print('You excited the server (TO CHANGE)')
-        self.close()
-
-
-    def start(self):
-        ''' Start the server '''
-        self.main_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.main_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.main_socket.bind(('', self.port))
-        self.main_socket.listen(0)
+        self.max_age = float(server_config['max_age'])
+        self.lease_time = float(server_config['lease_time'])
+        self.rate_limit = float(server_config['rate_limit'])
+
+        self._executor = ThreadPoolExecutor(thread_name_prefix='autolab_server')
+        self._leases = {}  # device_name: (ClientSession, expiration time)
+        self._cache = {}  # device_name: {address: (read time, value)}
+        self._pending_reads = {}  # address: future of the device read
+        self._subscribers = {}  # address: list of _Subscriber
+        self._samplers = {}  # address: sampling task
+        self._loop = None
+        self._stop = None
+
+        # Start the server and listen until closed
+        try: asyncio.run(self.serve())
+        except KeyboardInterrupt: pass
+        self._executor.shutdown(wait=False)
+        self.log('Autolab server closed')
+
+    async def serve(self):
+        ''' Start the server and accept clients until close is called '''
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+
+        main_server = await asyncio.start_server(
+            self.handle_client, '', self.port, reuse_address=True)
         self.log(f'Autolab server running, waiting for incoming connections on port {self.port}')
 
-
-    def listen(self):
-
-        while True:
-
-            # Wait incoming connection
-            client_socket, _ = self.main_socket.accept()
-
-            # Clean terminated threads
-            self.clean_client_threads()
-
-            # Start new client thread
-            client_thread = ClientThread(client_socket, self)
-            client_thread.start()
-            self.client_threads.append(client_thread)
-
-
-    def clean_client_threads(self):
-        ''' Remove finshed client threads from the list '''
-        self.client_threads = [t for t in self.client_threads if t.is_alive()]
-
-    def close_client_threads(self):
-        ''' Close any existing client thread '''
-        self.clean_client_threads()
-
-        for thread in self.client_threads:
-            thread.request_close()
-
-        self.client_threads = []
-
+        async with main_server:
+            await self._stop.wait()
+
+        for session in list(self.sessions):
+            session.close()
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+        ''' Serve a new client until it disconnects '''
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        session = ClientSession(self, reader, writer)
+        self.sessions.append(session)
+        await session.run()
+
+    def remove_session(self, session: ClientSession):
+        ''' Forget a closed client and release its leases '''
+        if session not in self.sessions: return None
+        self.sessions.remove(session)
+        for device_name, lease in list(self._leases.items()):
+            if lease[0] is session: self._leases.pop(device_name)
+        for subscription_id in list(session.subscriptions):
+            self.unsubscribe(session, subscription_id)
+        self.log(f'Host "{session.hostname}" disconnected')
+
+    async def execute(self, session: ClientSession, command: dict):
+        ''' Execute a client command on the local devices '''
+        if command['command'] == 'get_device_model':
+            return await self._loop.run_in_executor(
+                self._executor, lambda: get_model_description(
+                    get_device(command['device_name'])))
+
+        if command['command'] == 'lease':
+            return self.acquire_lease(session, command['device_name'])
+
+        if command['command'] == 'release':
+            lease = self._leases.get(command['device_name'])
+            if lease is not None and lease[0] is session:
+                self._leases.pop(command['device_name'])
+            return None
+
+        if command['command'] == 'subscribe':
+            return self.subscribe(session, command)
+
+        if command['command'] == 'unsubscribe':
+            return self.unsubscribe(session, command['id'])
+
+        address = command['address']
+        if command['command'] == 'read':
+            return await self.read(address)
+
+        # Write or action
+        device_name = address.split('.')[0]
+        self.acquire_lease(session, device_name)
+        self.clear_cache(device_name)
+        try:
+            return await self._loop.run_in_executor(
+                self._executor, execute_command, command)
+        finally:
+            self.clear_cache(device_name)
+
+    async def read(self, address: str):
+        ''' Read a variable, sharing the read with the other clients '''
+        device_name = address.split('.')[0]
+        device_cache = self._cache.setdefault(device_name, {})
+
+        if address in device_cache:
+            read_time, value = device_cache[address]
+            if self._loop.time() - read_time <= self.max_age:
+                return value
+
+        future = self._pending_reads.get(address)
+        if future is None:
+            future = self._loop.run_in_executor(
+                self._executor, execute_command,
+                {'command': 'read', 'address': address})
+            self._pending_reads[address] = future
+            future.add_done_callback(
+                partial(self._read_done, address, device_cache))
+
+        # shield: a client disconnection must not cancel the shared read
+        return await asyncio.shield(future)
+
+    def _read_done(self, address: str, device_cache: dict, future: asyncio.Future):
+        ''' Keeps the value read if no write occured meanwhile '''
+        if self._pending_reads.get(address) is not future: return None
+        self._pending_reads.pop(address)
+        if self.max_age > 0 and not future.cancelled() and future.exception() is None:
+            device_cache[address] = (self._loop.time(), future.result())
+
+    def subscribe(self, session: ClientSession, command: dict):
+        ''' Add a subscriber to a variable, sampled from now on. command is
+        {'command': 'subscribe', 'id': int, 'address': str,
+        'interval': float (s), 'on_change': bool} '''
+        assert command['id'] not in session.subscriptions, f"Subscription {command['id']} already exists"
+        subscriber = _Subscriber(session, command)
+        session.subscriptions[subscriber.id] = subscriber
+        self._subscribers.setdefault(subscriber.address, []).append(subscriber)
+
+        if subscriber.address not in self._samplers:
+            self._samplers[subscriber.address] = self._loop.create_task(
+                self.sample(subscriber.address))
+
+    def unsubscribe(self, session: ClientSession, subscription_id: int):
+        ''' Remove a subscriber, its variable is no longer sampled if it was
+        the last one '''
+        subscriber = session.subscriptions.pop(subscription_id, None)
+        if subscriber is None: return None
+        self._subscribers[subscriber.address].remove(subscriber)
+
+    async def sample(self, address: str):
+        ''' Read a variable for all its subscribers, at the smallest of their
+        intervals, until it has no more subscriber '''
+        subscribers = self._subscribers[address]
+
+        while subscribers:
+            interval = min(subscriber.interval for subscriber in subscribers)
+            start = self._loop.time()
+            try:
+                status, value = 'update', await self.read(address)
+            except Exception as e:
+                status, value = 'error', f'{e.__class__.__name__}: {e}'
+            timestamp = time.time()
+
+            now = self._loop.time()
+            for subscriber in list(subscribers):
+                subscriber.push(status, timestamp, value, now, interval)
+
+            await asyncio.sleep(max(start + interval - self._loop.time(), 0))
+
+        self._subscribers.pop(address)
+        self._samplers.pop(address)
+
+    def clear_cache(self, device_name: str):
+        ''' Forgets the reads of a device, done before and after a write '''
+        self._cache.pop(device_name, None)
+        for address in list(self._pending_reads):
+            if address.split('.')[0] == device_name:
+                self._pending_reads.pop(address)
+
+    def acquire_lease(self, session: ClientSession, device_name: str):
+        ''' Reserve the writes to a device for session during lease_time '''
+        now = time.monotonic()
+        lease = self._leases.get(device_name)
+        if lease is not None and lease[0] is not session and lease[1] > now:
+            raise PermissionError(
+                f"Device '{device_name}' is used by host '{lease[0].hostname}', retry in {lease[1]-now:.1f} s")
+        self._leases[device_name] = (session, now + self.lease_time)
 
     def log(self, log):
         ''' Display a log on the server '''
         timestamp = dt.datetime.now().isoformat()
         print(f'{timestamp}: {log}')
 
-
     def close(self):
-        ''' Close the server and client threads'''
-        self.close_client_threads()
-        self.main_socket.shutdown(socket.SHUT_RDWR)
-        self.main_socket.close()
+        ''' Close the server and client connections, can be called from
+        another thread '''
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
 
 
 class Driver_REMOTE(Driver_SOCKET):
 
     def __init__(self, address='192.168.1.1', port=4001):
-        from functools import partial
 
         self.address = address
         self.port = int(port)
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()  # one request at a time on the socket
+        self._receiver = None  # thread receiving the answers, see subscribe
+        self._pending = {}  # request id: Future of the answer
+        self._subscriptions = {}  # subscription id: Subscription
+        self._error = None  # error of the receiver thread
+        self._model = None  # model of the remote devices, see get_driver_model
+        self._users = 0  # devices using this connection, see get_remote_driver
 
         # Connection au serveur Autolab
         self.connect()
@@ -231,7 +546,6 @@ class Driver_REMOTE(Driver_SOCKET):
 
         # Retourne la liste des devices
         self.devices_status = self.get_devices_status()
-        print(self.devices_status)
 
 
     def connect(self):
@@ -240,6 +554,7 @@ class Driver_REMOTE(Driver_SOCKET):
         self.socket.settimeout(2)
         self.socket.connect((self.address, self.port))
         self.socket.settimeout(None)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
 
     def handshake(self):
@@ -253,73 +568,299 @@ class Driver_REMOTE(Driver_SOCKET):
 
     def disconnect(self):
         ''' Close autolab server connection '''
-        self.socket.write('CLOSE_CONNECTION')
+        with self._lock: self.write('CLOSE_CONNECTION')
         self.socket.shutdown(socket.SHUT_RDWR)
         self.socket.close()
 
     def get_devices_status(self): # Déjà instantié ou non
-        self.write('DEVICES_STATUS?')
-        return self.read()
+        return self.request('DEVICES_STATUS?')
+
+    def request(self, command):
+        ''' Send a command to the server and returns its answer '''
+        return self.pipeline([command])[0]
+
+    def new_id(self) -> int:
+        ''' Returns a new request id, 0 is used by the server to push the
+        values of the subscriptions '''
+        return next(self._request_ids) % (2**32 - 1) + 1
+
+    def pipeline(self, commands: list) -> list:
+        ''' Send all the commands before reading their answers, in order.
+        Once the receiver thread is started (see subscribe), the answers are
+        received by this thread '''
+        with self._lock:
+            if self._error is not None:
+                raise ConnectionError(f'Autolab server at {self.address}:{self.port} disconnected: {self._error}')
+
+            request_ids = []
+            futures = []
+            for command in commands:
+                request_ids.append(self.new_id())
+                if self._receiver is not None:
+                    futures.append(Future())
+                    self._pending[request_ids[-1]] = futures[-1]
+                self.write_frame(request_ids[-1], command)
+
+            if self._receiver is None:
+                answers = []
+                for request_id in request_ids:
+                    answer_id, answer = self.read_frame()
+                    assert answer_id == request_id, f'Answer to request {answer_id} received instead of {request_id}'
+                    answers.append(answer)
+                return answers
+
+        return [future.result() for future in futures]
+
+    def _receive(self):
+        ''' Receive the answers and the values of the subscriptions pushed by
+        the server, until the connection is closed '''
+        try:
+            while True:
+                request_id, answer = self.read_frame()
+                if request_id == 0:
+                    subscription = self._subscriptions.get(answer[1])
+                    if subscription is not None: subscription._push(answer)
+                else:
+                    self._pending.pop(request_id).set_result(answer)
+        except Exception as e:
+            with self._lock:
+                self._error = e
+                for future in self._pending.values():
+                    future.set_exception(ConnectionError(
+                        f'Autolab server at {self.address}:{self.port} disconnected: {e}'))
+                self._pending.clear()
+            for subscription in list(self._subscriptions.values()):
+                subscription._push(('closed', subscription.id, time.time(), str(e)))
+
+    def subscribe(self, address: str, interval: float = 0.1,
+                  on_change: bool = False, max_pending: int = 100):
+        ''' Returns a Subscription receiving the values of the remote variable
+        at address, read by the server every interval seconds (as fast as
+        possible if 0). With on_change, only the values different from the
+        last one received are sent. At most max_pending values are kept if
+        they are not read fast enough with Subscription.get '''
+        with self._lock:
+            if self._receiver is None:
+                self._receiver = threading.Thread(
+                    target=self._receive, daemon=True,
+                    name=f'autolab_remote_{self.address}:{self.port}')
+                self._receiver.start()
+
+        subscription = Subscription(self, self.new_id(), address, interval, max_pending)
+        self._subscriptions[subscription.id] = subscription
+        try:
+            self.query({'command': 'subscribe', 'id': subscription.id,
+                        'address': address, 'interval': interval,
+                        'on_change': on_change})
+        except:
+            self._subscriptions.pop(subscription.id)
+            raise
+        return subscription
+
+    def query(self, command: dict):
+        ''' Send an element command to the server and returns its result '''
+        return self._check_answer(self.request(command))
+
+    def batch(self, commands: list) -> list:
+        ''' Send several element commands in one request and returns their
+        results. For example, read two variables and write a third one:
+        [{'command': 'read', 'address': 'dev.power'},
+        {'command': 'read', 'address': 'dev.wavelength'},
+        {'command': 'write', 'address': 'dev.amplitude', 'value': 1.}] '''
+        answers = self._check_answer(
+            self.request({'command': 'batch', 'commands': commands}))
+        return [self._check_answer(answer) for answer in answers]
+
+    def _check_answer(self, answer):
+        ''' Returns the result of an answer or raise the remote error '''
+        status, result = answer
+        if status == 'error':
+            raise RuntimeError(f'Autolab server at {self.address}:{self.port}: {result}')
+        return result
 
     def get_driver_model(self):
-        model = []
-        for dev_name in self.devices_status.keys():
-            a = FakeDriver(self, dev_name, status)
-            model.append({'element': 'module', 'name': dev_name, 'object': a})
-            a.get_driver_model()
-            partial(devices.Device, dev_name)
-        return model
+        ''' Returns a submodule for each device loaded on the server, mirroring
+        its elements. The remote structures are requested once, in one batch '''
+        if self._model is None:
+            device_names = [device_name for device_name, loaded
+                            in self.devices_status.items() if loaded]
+            answers = self.request({'command': 'batch', 'commands': [
+                {'command': 'get_device_model', 'device_name': device_name}
+                for device_name in device_names]})[1]
+
+            self._model = []
+            for device_name, (status, result) in zip(device_names, answers):
+                if status == 'error':
+                    print(f"Can't get the structure of remote device '{device_name}': {result}",
+                          file=sys.stderr)
+                    continue
+                self._model.append({
+                    'element': 'module', 'name': device_name,
+                    'object': FakeDriver(self, device_name, result)})
+
+        return self._model
 
-    def get_device(self, dev_name):
-        pass
+    def close(self):
+        ''' Release the connection, closed when no more device uses it '''
+        with _remote_lock:
+            self._users -= 1
+            if self._users > 0: return None
+            _REMOTE_DRIVERS.pop((self.address, self.port), None)
+        try: self.disconnect()
+        except: pass
 
-    def get_device_structure(self):
-        pass
-            # Pour un device de slave donné, retourne sa structure de (sous-devices, modules, action variable) à l’instant t
-            # Device non instantité : ne renvoie rien
-            # Device instantié : renvoie structure en (modules, action, variable)
 
+class Subscription():
+    ''' Values of a remote variable pushed by an autolab server, see
+    Driver_REMOTE.subscribe '''
 
-class FakeDriver():
+    def __init__(self, driver_remote: Driver_REMOTE, subscription_id: int,
+                 address: str, interval: float, max_pending: int):
+
+        self.driver_remote = driver_remote
+        self.id = subscription_id
+        self.address = address
+        self.interval = interval
+        self._updates = collections.deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+
+    def _push(self, update: tuple):
+        ''' Store an update (status, id, timestamp, value) received '''
+        with self._condition:
+            self._updates.append(update)
+            self._condition.notify()
+
+    def get(self, timeout: float = None) -> tuple:
+        ''' Returns the oldest value received as (timestamp, value), waiting
+        at most timeout seconds for it (None if no value received).
+        Raises the error of the server if the read failed '''
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._updates, timeout):
+                return None
+            status, _, timestamp, value = self._updates.popleft()
+
+        if status == 'error':
+            raise RuntimeError(f'Autolab server at {self.driver_remote.address}:{self.driver_remote.port}: {value}')
+        if status == 'closed':
+            self._push((status, self.id, timestamp, value))  # keep failing
+            raise ConnectionError(f'Autolab server at {self.driver_remote.address}:{self.driver_remote.port} disconnected: {value}')
+        return timestamp, value
+
+    def close(self):
+        ''' Stop receiving the values '''
+        if self.driver_remote._subscriptions.pop(self.id, None) is None: return None
+        try:
+            self.driver_remote.query({'command': 'unsubscribe', 'id': self.id})
+        except ConnectionError: pass
+
+
+# Connections to autolab servers, shared by the devices using the same server
+_REMOTE_DRIVERS = {}  # (address, port): Driver_REMOTE
+_remote_lock = threading.Lock()
 
-    def __init__(self, driver_remote, name, status):
+
+def get_remote_driver(address: str = '192.168.1.1', port: int = 4001) -> Driver_REMOTE:
+    ''' Returns the connection to the autolab server at address:port, reusing
+    the existing one. Each call must be followed by a close of the driver '''
+    with _remote_lock:
+        key = (address, int(port))
+        if key not in _REMOTE_DRIVERS:
+            _REMOTE_DRIVERS[key] = Driver_REMOTE(address, port)
+        driver = _REMOTE_DRIVERS[key]
+        driver._users += 1
+    return driver
+
+
+def get_model_description(module) -> list:
+    ''' Returns the description of the elements of a module, sent to the
+    remote clients to mirror it (see FakeDriver) '''
+    description = []
+
+    for name in module.list_modules():
+        submodule = module.get_module(name)
+        description.append({
+            'element': 'module', 'name': name, 'help': submodule._help,
+            'model': get_model_description(submodule)})
+
+    for name in module.list_variables():
+        variable = module.get_variable(name)
+        description.append({
+            'element': 'variable', 'name': name, 'type': variable.type,
+            'unit': variable.unit, 'help': variable._help,
+            'readable': variable.readable, 'writable': variable.writable,
+            'read_init': variable.read_init})
+
+    for name in module.list_actions():
+        action = module.get_action(name)
+        description.append({
+            'element': 'action', 'name': name, 'param_type': action.type,
+            'param_unit': action.unit, 'help': action._help})
+
+    return description
+
+
+class RemoteElement():
+    ''' Element of a remote device, which methods are used as driver functions '''
+
+    def __init__(self, driver_remote: Driver_REMOTE, address: str):
 
         self.driver_remote = driver_remote
-        self.name = name
-        self.status = status
+        self.address = address
 
-    def get_driver_model(self):
-        model = []
-        if status is False:
-            return model
-        else:
-            command_dict = {'command': 'get_device_structure', 'name': self.name}
-            remote_device_structure = self.driver_remote.write(command_dict)
+    def read(self):
+        return self.driver_remote.query({'command': 'read', 'address': self.address})
+
+    def subscribe(self, interval: float = 0.1, on_change: bool = False) -> Subscription:
+        return self.driver_remote.subscribe(self.address, interval, on_change)
 
-            for key in remote_device_structure.keys():
-                if remote_device_structure[key] == 'variable':
-                    arg = {'command': 'request', address: 'yenista::wavelength'}
-                    #model.append({'element':remote_device_structure[key], 'name':key, 'read': partial(self.interact,'read',address) .., 'write'})
-                elif remote_device_structure[key] == 'action':
-                    pass
-                elif remote_device_structure[key] == 'module':
-                    pass
+    def write(self, value):
+        self.driver_remote.query(
+            {'command': 'write', 'address': self.address, 'value': value})
 
-            return remote_driver_model
+    def execute(self, value=None):
+        command = {'command': 'execute', 'address': self.address}
+        if value is not None: command['value'] = value
+        self.driver_remote.query(command)
 
-    def interact(interaction_type, address):
-        pass
 
+class FakeDriver():
+    ''' Driver of a remote module, built from its description '''
+
+    def __init__(self, driver_remote: Driver_REMOTE, address: str, description: list):
 
-#{'slot1': {'power': 'variable', 'wavelength': 'variable'},
-# 'amplitude': 'variable',
-# 'something': 'action'}
+        self.driver_remote = driver_remote
+        self.address = address
+        self.description = description
 
-#def get_driver_model(self):
+    def get_driver_model(self):
+        model = []
 
- #    model = []
-#    model.append({'element':'variable','name':'amplitude','write':self.amplitude,'read':self.get_amplitude,'unit':'V','type':float,'help':'Amplitude'})
-#    model.append({'element':'variable','name':'offset','write':self.offset,'read':self.get_offset,'unit':'V','type':float,'help':'Offset'})
-#    model.append({'element':'variable','name':'frequency','write':self.frequency,'read':self.get_frequency,'unit':'Hz','type':float,'help':'Frequency'})
+        for element in self.description:
+            address = f"{self.address}.{element['name']}"
+            config = {'element': element['element'], 'name': element['name']}
+            if element['help'] is not None: config['help'] = element['help']
+
+            if element['element'] == 'module':
+                config['object'] = FakeDriver(
+                    self.driver_remote, address, element['model'])
+
+            elif element['element'] == 'variable':
+                remote_element = RemoteElement(self.driver_remote, address)
+                config['type'] = element['type']
+                if element['unit'] is not None: config['unit'] = element['unit']
+                if element['readable']:
+                    config['read'] = remote_element.read
+                    config['read_init'] = element['read_init']
+                if element['writable']: config['write'] = remote_element.write
+
+            elif element['element'] == 'action':
+                remote_element = RemoteElement(self.driver_remote, address)
+                config['do'] = remote_element.execute
+                if element['param_type'] is not None:
+                    config['param_type'] = element['param_type']
+                    if element['param_unit'] is not None:
+                        config['param_unit'] = element['param_unit']
+
+            model.append(config)
 
-#    return model
+        return model
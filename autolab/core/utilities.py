@@ -4,15 +4,21 @@ Created on Fri Oct 18 23:09:51 2019
 
 @author: qchat
 """
-from typing import Any, List, Tuple
+from typing import Any, List, Tuple, TYPE_CHECKING
 import re
 import ast
 from io import StringIO
 import platform
 import os
+import threading
+import weakref
+from collections import OrderedDict
 
-import numpy as np
-import pandas as pd
+# numpy and pandas are imported in the functions using them, not needed to
+# import autolab (config, infos)
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 
 SUPPORTED_EXTENSION = "Text Files (*.txt);; Supported text Files (*.txt;*.csv;*.dat);; Any Files (*)"
@@ -96,9 +102,10 @@ def str_to_tuple(s: str) -> Tuple[List[str], int]:
     except Exception:
         raise Exception(e)
 
-def create_array(value: Any) -> np.ndarray:
+def create_array(value: Any) -> 'np.ndarray':
     ''' Format an int, float, list or numpy array to a numpy array with at least
     one dimension '''
+    import numpy as np
     # check validity of array, raise error if dtype not int or float
     np.array(value, ndmin=1, dtype=float)
     # Convert to ndarray and keep original dtype
@@ -110,7 +117,7 @@ def create_array(value: Any) -> np.ndarray:
     return value
 
 
-def str_to_array(s: str) -> np.ndarray:
+def str_to_array(s: str) -> 'np.ndarray':
     ''' Convert string to a numpy array '''
     if "," in s: ls = re.sub(r'\s,+', ',', s)
     else: ls = re.sub(r'\s+', ',', s)
@@ -121,12 +128,14 @@ def str_to_array(s: str) -> np.ndarray:
 
 def array_to_str(value: Any, threshold: int = None, max_line_width: int = None) -> str:
     ''' Convert a numpy array to a string '''
+    import numpy as np
     return np.array2string(np.array(value), separator=',', suppress_small=True,
                            threshold=threshold, max_line_width=max_line_width)
 
 
-def str_to_dataframe(s: str) -> pd.DataFrame:
+def str_to_dataframe(s: str) -> 'pd.DataFrame':
     ''' Convert a string to a pandas DataFrame '''
+    import pandas as pd
     if s == '\r\n':  # empty
         df = pd.DataFrame()
     else:
@@ -135,8 +144,9 @@ def str_to_dataframe(s: str) -> pd.DataFrame:
     return df
 
 
-def dataframe_to_str(value: pd.DataFrame, threshold=1000) -> str:
+def dataframe_to_str(value: 'pd.DataFrame', threshold=1000) -> str:
     ''' Convert a pandas DataFrame to a string '''
+    import pandas as pd
     if isinstance(value, str) and value == '': value = None
     return pd.DataFrame(value).head(threshold).to_csv(index=False, sep="\t")  # can't display full data to QLineEdit, need to truncate (numpy does the same)
 
@@ -157,6 +167,8 @@ def str_to_data(s: str) -> Any:
 
 def data_to_str(value: Any) -> str:
     """ Convert data to str with special format for ndarray and dataframe """
+    import numpy as np
+    import pandas as pd
     if isinstance(value, np.ndarray):
         raw_value_str = array_to_str(value, threshold=1000000, max_line_width=9000000)
     elif isinstance(value, pd.DataFrame):
@@ -174,8 +186,72 @@ def open_file(filename: str):
     elif system == 'Darwin': os.system(f'open "{filename}"')
 
 
-def data_to_dataframe(data: Any) -> pd.DataFrame:
+NUMERIC_KINDS = 'biuf'  # numpy dtype kinds that don't need numeric coercion
+DATAFRAME_CACHE_SIZE = 128
+
+_dataframe_cache = OrderedDict()  # id(data) -> (weakref of data, DataFrame)
+_dataframe_cache_lock = threading.Lock()
+
+
+def data_to_dataframe(data: Any, cache: bool = True) -> 'pd.DataFrame':
+    """ Format data to DataFrame.
+    If cache, the result is kept for ndarray and DataFrame inputs and returned
+    as long as the same object is given, so the returned DataFrame must not be
+    modified inplace. Use cache=False for data converted only once. """
+    if not cache: return _data_to_dataframe(data)
+
+    key = id(data)
+    with _dataframe_cache_lock:
+        entry = _dataframe_cache.get(key)
+        if entry is not None and entry[0]() is data:
+            _dataframe_cache.move_to_end(key)
+            return entry[1]
+
+    formated_data = _data_to_dataframe(data)
+
+    def remove(ref, key=key):
+        with _dataframe_cache_lock:
+            entry = _dataframe_cache.get(key)
+            if entry is not None and entry[0] is ref:
+                del _dataframe_cache[key]
+
+    try:
+        ref = weakref.ref(data, remove)
+    except TypeError:  # list, scalar... can't be cached
+        return formated_data
+
+    with _dataframe_cache_lock:
+        _dataframe_cache[key] = (ref, formated_data)
+        while len(_dataframe_cache) > DATAFRAME_CACHE_SIZE:
+            _dataframe_cache.popitem(last=False)
+
+    return formated_data
+
+
+def clear_dataframe_cache():
+    """ Remove all DataFrames cached by data_to_dataframe """
+    with _dataframe_cache_lock:
+        _dataframe_cache.clear()
+
+
+def _data_to_dataframe(data: Any) -> 'pd.DataFrame':
     """ Format data to DataFrame """
+    import numpy as np
+    import pandas as pd
+    # Fast path: numerical data doesn't need coercion nor copy
+    if (isinstance(data, np.ndarray) and data.ndim in (1, 2)
+            and data.dtype.kind in NUMERIC_KINDS):
+        nb_columns = 1 if data.ndim == 1 else data.shape[1]
+        data = pd.DataFrame(data, columns=[str(i) for i in range(nb_columns)],
+                            copy=False)
+        return _format_columns(_remove_nan_row(data))
+
+    if (isinstance(data, pd.DataFrame)
+            and all(dtype.kind in NUMERIC_KINDS for dtype in data.dtypes)):
+        data = pd.DataFrame(data, copy=False)
+        data.columns = data.columns.astype(str)
+        return _format_columns(_remove_nan_row(data))
+
     try: data = pd.DataFrame(data)
     except ValueError: data = pd.DataFrame([data])
 
@@ -187,15 +263,23 @@ def data_to_dataframe(data: Any) -> pd.DataFrame:
     except ValueError:
         pass  # OPTIMIZE: This happens when there is identical column name
 
-    if len(data) != 0:
+    return _format_columns(_remove_nan_row(data, data_type))
+
+
+def _remove_nan_row(data: 'pd.DataFrame', data_type: 'np.dtype' = None) -> 'pd.DataFrame':
+    """ Checks that data is not full of nan and removes last line if full of nan """
+    if len(data) != 0 and data.iloc[-1].isnull().values.all():
+        if data_type is None: data_type = data.values.dtype
         assert not data.isnull().values.all(), f"Datatype '{data_type}' is not supported"
-        if data.iloc[-1].isnull().values.all():  # if last line is full of nan, remove it
-            data = data[:-1]
+        data = data[:-1]  # if last line is full of nan, remove it
+    return data
 
+
+def _format_columns(data: 'pd.DataFrame') -> 'pd.DataFrame':
+    """ Adds an index column '0' if data has a single column """
     if data.shape[1] == 1:
-        data.rename(columns = {'0': '1'}, inplace=True)
+        data = data.rename(columns = {'0': '1'})
         data.insert(0, "0", range(data.shape[0]))
-
     return data
 
 
@@ -6,7 +6,11 @@ Created on Mon Mar  4 14:54:41 2024
 """
 
 import re
-from typing import Any, List, Tuple
+import ast
+import builtins
+from functools import lru_cache
+from types import CodeType
+from typing import Any, List, Tuple, Dict, Set, FrozenSet
 
 import numpy as np
 import pandas as pd
@@ -45,18 +49,44 @@ from .utilities import clean_string
 # VARIABLES = MyDict()
 VARIABLES = {}
 
+# Dependency graph of the $eval: variables: name -> names of the VARIABLES
+# which expression uses name
+DEPENDENTS: Dict[str, Set[str]] = {}
+
 EVAL = "$eval:"
 
 
+# Namespace of the evaluations: modules, then DEVICES, then VARIABLES by
+# increasing precedence. Always the same dict, updated in place.
+allowed_dict = {}
+_MODULES = {"np": np, "pd": pd}
+
+
 def update_allowed_dict() -> dict:
-    global allowed_dict  # needed to remove variables instead of just adding new one
-    allowed_dict = {"np": np, "pd": pd}
-    allowed_dict.update(DEVICES)
-    allowed_dict.update(VARIABLES)
+    """ Rebuilds allowed_dict, used when the loaded devices change """
+    namespace = dict(_MODULES)
+    namespace.update(DEVICES)
+    namespace.update(VARIABLES)
+    allowed_dict.clear()
+    allowed_dict.update(namespace)
+    # Cached values may depend on the devices
+    for var in VARIABLES.values():
+        var._valid = not has_eval(var.raw)
     return allowed_dict
 
 
-allowed_dict = update_allowed_dict()
+def _update_allowed_name(name: str):
+    """ Updates only name in allowed_dict after a change of VARIABLES """
+    for namespace in (VARIABLES, DEVICES, _MODULES):
+        if name in namespace:
+            allowed_dict[name] = namespace[name]
+            break
+    else:
+        allowed_dict.pop(name, None)
+    _invalidate(name)
+
+
+update_allowed_dict()
 
 # OPTIMIZE: Variable becomes closer and closer to core.elements.Variable, could envision a merge
 # TODO: refresh menu display by looking if has eval (no -> can refresh)
@@ -87,23 +117,39 @@ class Variable():
             self.raw = var
             self.value = 'Need update' if has_eval(self.raw) else self.raw
 
-        # If no devices or variables with char '(' found in raw, can evaluate value safely
-        if not has_variable(self.raw) or '(' not in self.raw:
-            try: self.value = self.read_function()
+        # Value of an expression computed on read, then cached if cacheable
+        self._valid = not has_eval(self.raw)
+
+        registered = VARIABLES.get(self.name) is self
+        if registered: _unregister_dependencies(self.name, self)
+        self._dependencies = get_dependencies(self.raw) if has_eval(self.raw) else frozenset()
+        if registered: _register_dependencies(self.name, self)
+        _invalidate(self.name)
+
+        # Expressions not reading any device can be evaluated safely
+        if has_eval(self.raw) and not _reads_device(self._dependencies):
+            try: self.read_function()
             except Exception as e: self.value = str(e)
 
         self.type = type(self.raw)  # For slider
 
     def read_function(self):
         if has_eval(self.raw):
-            value = str(self.raw)[len(EVAL): ]
-            call = eval(str(value), {}, allowed_dict)
+            if self._valid: return self.value
+            call = eval(compile_eval(self.raw), {}, allowed_dict)
             self.value = call
+            self._valid = self._is_cacheable()
         else:
             call = self.value
 
         return call
 
+    def _is_cacheable(self) -> bool:
+        """ Returns True if the value of the expression only depends on
+        variables, and not on devices, so it can be kept until a
+        dependency changes """
+        return _is_cacheable(self._dependencies)
+
     def __call__(self, value: Any = None) -> Any:
         if value is None:
             return self.read_function()
@@ -121,9 +167,12 @@ def rename_variable(name: str, new_name: str):
     ''' Rename an existing Variable '''
     new_name = clean_string(new_name)
     var = VARIABLES.pop(name)
+    _unregister_dependencies(name, var)
     VARIABLES[new_name] = var
     var._rename(new_name)
-    update_allowed_dict()
+    _register_dependencies(new_name, var)
+    _update_allowed_name(name)
+    _update_allowed_name(new_name)
 
 
 def set_variable(name: str, value: Any) -> Variable:
@@ -140,8 +189,11 @@ def set_variable(name: str, value: Any) -> Variable:
         else:
             var = Variable(name, value)
 
-    VARIABLES[name] = var
-    update_allowed_dict()
+    if VARIABLES.get(name) is not var:
+        if name in VARIABLES: _unregister_dependencies(name, VARIABLES[name])
+        VARIABLES[name] = var
+        _register_dependencies(name, var)
+    if allowed_dict.get(name) is not var: _update_allowed_name(name)
     return var
 
 
@@ -153,7 +205,8 @@ def get_variable(name: str) -> Variable:
 
 def remove_variable(name: str) -> Variable:
     var = VARIABLES.pop(name)
-    update_allowed_dict()
+    _unregister_dependencies(name, var)
+    _update_allowed_name(name)
     return var
 
 
@@ -170,22 +223,161 @@ def update_from_config(variables: List[Tuple[str, Any]]):
 
 def has_variable(value: str) -> bool:
     if not isinstance(value, str): return False
-    if has_eval(value): value = value[len(EVAL): ]
+    if not has_eval(value): value = EVAL + value
 
-    pattern = r'[a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)*'
-    pattern_match = [var.split('.')[0] for var in re.findall(pattern, value)]
+    names = get_dependencies(value)
+    if not names:  # Also if not a valid expression
+        pattern = r'[a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)*'
+        names = [var.split('.')[0] for var in re.findall(pattern, value[len(EVAL): ])]
 
-    for key in (list(DEVICES) + list(VARIABLES)):
-        if key in pattern_match:
+    for name in names:
+        if name in DEVICES or name in VARIABLES:
             return True
     return False
 
 
+# =============================================================================
+# DEPENDENCY GRAPH
+# =============================================================================
+
+# Functions returning the same value for the same arguments, the only calls
+# kept in cache with the value of an expression (np.random.rand(),
+# pd.Timestamp.now(), open()... are evaluated at each read)
+_PURE_CALLS = frozenset((
+    'abs', 'all', 'any', 'bool', 'complex', 'dict', 'divmod', 'enumerate',
+    'filter', 'float', 'frozenset', 'int', 'len', 'list', 'map', 'max', 'min',
+    'pow', 'range', 'reversed', 'round', 'set', 'slice', 'sorted', 'str',
+    'sum', 'tuple', 'zip',
+    *(f'np.{name}' for name in (
+        'abs', 'arange', 'arccos', 'arcsin', 'arctan', 'arctan2', 'array',
+        'asarray', 'ceil', 'clip', 'concatenate', 'cos', 'cosh', 'cumsum',
+        'deg2rad', 'diff', 'exp', 'floor', 'full', 'hypot', 'linspace', 'log',
+        'log10', 'log2', 'logspace', 'max', 'mean', 'min', 'ones', 'rad2deg',
+        'round', 'sign', 'sin', 'sinh', 'sqrt', 'sum', 'tan', 'tanh', 'zeros')),
+    'pd.DataFrame', 'pd.Series'))
+
+
+def _call_name(node: ast.AST) -> str:
+    """ Returns the dotted name of a called function, '' if not a name
+    (method of a computed value) """
+    names = []
+    while isinstance(node, ast.Attribute):
+        names.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name): return ''
+    names.append(node.id)
+    return '.'.join(reversed(names))
+
+
+@lru_cache(maxsize=1024)
+def get_dependencies(value: str) -> FrozenSet[str]:
+    """ Returns the names read by the python expression of a string starting
+    with '$eval:' (variables, devices, modules, builtins), without the names
+    defined inside it (comprehensions, lambdas).
+    The name '$call:<function>' is added for each call of a function not in
+    _PURE_CALLS """
+    try:
+        tree = ast.parse(value[len(EVAL): ], mode='eval')
+    except SyntaxError:
+        return frozenset()
+
+    loaded = set()
+    defined = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load): loaded.add(node.id)
+            else: defined.add(node.id)
+        elif isinstance(node, ast.arg):
+            defined.add(node.arg)
+        elif isinstance(node, ast.Call):
+            name = _call_name(node.func)
+            if name not in _PURE_CALLS: loaded.add(f'$call:{name}')
+
+    return frozenset(loaded - defined)
+
+
+def _is_cacheable(names: FrozenSet[str], visited: Set[str] = None) -> bool:
+    """ Returns True if an expression reading names gives the same value until
+    one of the VARIABLES it reads changes """
+    if visited is None: visited = set()
+
+    for name in names:
+        if name in VARIABLES:
+            if name in visited: continue
+            visited.add(name)
+            var = VARIABLES[name]
+            if has_eval(var.raw) and not _is_cacheable(var._dependencies, visited):
+                return False
+        elif name.startswith('$call:'):
+            # Only the calls of variables, read themselves
+            if name[len('$call:'): ] not in VARIABLES: return False
+        elif name in DEVICES:
+            return False
+        elif name not in _MODULES and not hasattr(builtins, name):
+            return False  # unknown name, fails on evaluation
+
+    return True
+
+
+def _reads_device(names: FrozenSet[str], visited: Set[str] = None) -> bool:
+    """ Returns True if an expression reading names reads a device, directly
+    or through the VARIABLES it reads """
+    if visited is None: visited = set()
+
+    for name in names:
+        if name in DEVICES:
+            return True
+        if name in VARIABLES and name not in visited:
+            visited.add(name)
+            var = VARIABLES[name]
+            if has_eval(var.raw) and _reads_device(var._dependencies, visited):
+                return True
+
+    return False
+
+
+def _register_dependencies(name: str, var: Variable):
+    """ Adds the dependencies of the variable name to the graph """
+    for dependency in var._dependencies:
+        DEPENDENTS.setdefault(dependency, set()).add(name)
+
+
+def _unregister_dependencies(name: str, var: Variable):
+    """ Removes the dependencies of the variable name from the graph """
+    for dependency in var._dependencies:
+        dependents = DEPENDENTS.get(dependency)
+        if dependents is not None:
+            dependents.discard(name)
+            if len(dependents) == 0: DEPENDENTS.pop(dependency)
+
+
+def _invalidate(name: str):
+    """ Forgets the cached values of the variables depending, even
+    indirectly, on name """
+    names = [name]
+    invalidated = set()
+    while names:
+        for dependent in DEPENDENTS.get(names.pop(), ()):
+            if dependent in invalidated: continue
+            invalidated.add(dependent)
+            var = VARIABLES.get(dependent)
+            if var is not None: var._valid = False
+            names.append(dependent)
+
+
 def has_eval(value: Any) -> bool:
     """ Checks if value is a string starting with '$eval:'"""
     return True if isinstance(value, str) and value.startswith(EVAL) else False
 
 
+@lru_cache(maxsize=1024)
+def compile_eval(value: str) -> CodeType:
+    """ Returns the compiled code of the python expression of a string
+    starting with '$eval:'. Cached by expression as the same expressions are
+    evaluated at each point of a scan """
+    return compile(value[len(EVAL): ], '<eval>', 'eval')
+
+
 def is_Variable(value: Any):
     """ Returns True if value of type Variable """
     return isinstance(value, Variable)
@@ -194,15 +386,19 @@ def is_Variable(value: Any):
 def eval_variable(value: Any) -> Any:
     """ Evaluate the given python string. String can contain variables,
     devices, numpy arrays and pandas dataframes."""
-    if has_eval(value): value = Variable('temp', value)
+    if has_eval(value): return eval(compile_eval(value), {}, allowed_dict)
 
     if is_Variable(value): return value()
     return value
 
 
 def eval_safely(value: Any) -> Any:
-    """ Same as eval_variable but do not evaluate if contains devices or variables """
-    if has_eval(value): value = Variable('temp', value)
+    """ Same as eval_variable but do not evaluate if reads devices, directly
+    or through variables """
+    if has_eval(value):
+        if _reads_device(get_dependencies(value)): return 'Need update'
+        try: return eval(compile_eval(value), {}, allowed_dict)
+        except Exception as e: return str(e)
 
     if is_Variable(value): return value.value
     return value
@@ -4,7 +4,6 @@ import os
 import shutil
 
 from .paths import PATHS, DRIVER_LEGACY, DRIVER_SOURCES
-from .repository import install_drivers
 
 
 def process_all_changes():
@@ -33,6 +32,7 @@ def move_driver():
             os.rename(os.path.join(PATHS['drivers'], os.path.basename(DRIVER_LEGACY['official'])),
                       DRIVER_SOURCES['official'])
             print(f"Old official drivers directory has been moved from: {DRIVER_LEGACY['official']} to: {DRIVER_SOURCES['official']}")
+            from .repository import install_drivers
             install_drivers()  # Ask if want to download official drivers
 
         if os.path.exists(DRIVER_LEGACY["local"]):
@@ -6,11 +6,11 @@ Created on Fri Nov 22 21:03:46 2019
 """
 from threading import Thread, Event
 from autolab.core import elements
+from autolab.core.io_scheduler import set_io_priority
 import collections
 import itertools
 import os
 import time
-import h5py
 
 class Scanner :
     
@@ -266,6 +266,7 @@ class ScanThread(Thread):
             for key in obj.keys(): 
                 if isinstance(obj[key],(Parameter,Measure)) :
                     file.create_dataset(key, (data_length,))     
+        import h5py
         with h5py.File(self.datapath, "a") as file :
             configure(file,self.scanner._initrecipe,1)
             configure(file,self.scanner._parameters,len(self.param_sets))
@@ -278,6 +279,8 @@ class ScanThread(Thread):
         
         ''' Start the execution of the scan '''
         
+        set_io_priority('scan')
+        
         # Init recipe
         self.reset_data()
         self.execute_recipe(self.scanner._initrecipe)
@@ -346,7 +349,7 @@ class ScanThread(Thread):
                 value = param_set[key]
                 if key not in self.data.keys() or value != self.data[key] : 
                     parameter = self.scanner._parameters[key]
-                    parameter.element(param_set[key])
+                    parameter.element.fast_write(param_set[key])
                     self.data[key] = value
                     if self.scanner.verbose : print(key, parameter.info(), value)
                     
@@ -369,6 +372,7 @@ class ScanThread(Thread):
         """ Save in the whole content of the current self.data dictionnary 
         in the hdf5 datafile """
         
+        import h5py
         with h5py.File(self.datapath, "a") as file :
             for key in self.data.keys():
                 file[key][i] = self.data[key]
@@ -450,7 +454,7 @@ class Set:
         return f'Set variable {self.element.address()} with value {self.value}.'
         
     def execute(self):
-        self.element(self.value)
+        self.element.fast_write(self.value)
         
         
         
@@ -469,7 +473,7 @@ class Measure:
         return f'Measure variable {self.element.address()}.'
         
     def execute(self):
-        return self.element()
+        return self.element.fast_read()
 
 
 
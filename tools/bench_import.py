@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the import time of autolab, measured with "import autolab" in
+fresh python processes. Fails if numpy, pandas, asyncio or qtpy is imported
+by "import autolab", or if the median time exceeds --max-time milliseconds.
+
+Usage: python tools/bench_import.py [--repeat N] [--max-time MS]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy modules that must only be imported when used
+LAZY_MODULES = ('numpy', 'pandas', 'asyncio', 'qtpy')
+
+# Benchmark the autolab of this repository, not an installed one
+SCRIPT = f"""
+import sys, time, json
+sys.path.insert(0, {ROOT!r})
+start = time.perf_counter()
+import autolab
+duration = time.perf_counter() - start
+print(json.dumps([duration, [name for name in {LAZY_MODULES!r} if name in sys.modules]]))
+"""
+
+
+def measure() -> tuple:
+    """ Returns the import time of autolab in ms and the heavy modules
+    imported, from a fresh python process """
+    output = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    duration, modules = json.loads(output.splitlines()[-1])
+    return duration * 1e3, modules
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Number of processes')
+    parser.add_argument('--max-time', type=float, default=None,
+                        help='Maximal median import time in ms')
+    args = parser.parse_args(args)
+
+    measure()  # warm the file system cache and the bytecode
+    durations = []
+    imported = set()
+    for _ in range(args.repeat):
+        duration, modules = measure()
+        durations.append(duration)
+        imported.update(modules)
+
+    median = statistics.median(durations)
+    print(f'import autolab: median {median:.1f} ms, '
+          f'min {min(durations):.1f} ms, max {max(durations):.1f} ms '
+          f'({args.repeat} processes)')
+
+    failed = False
+    if imported:
+        print(f"Modules imported by 'import autolab': {', '.join(sorted(imported))}",
+              file=sys.stderr)
+        failed = True
+    if args.max_time is not None and median > args.max_time:
+        print(f'Median import time above {args.max_time} ms', file=sys.stderr)
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
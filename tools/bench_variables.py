@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the call overhead of a Variable (read and write of a float
+variable of the dummy device), compared to the driver functions called
+directly. Fails if fast_read or fast_write costs more than --max-overhead
+microseconds above the same driver call made in a plain "with RLock:" block
+(the minimal cost of the device lock, with the type conversion of fast_write),
+or if they are slower than __call__, which checks the variable and calls them.
+
+Usage: python tools/bench_variables.py [--number N] [--max-overhead US]
+"""
+import os
+import sys
+import timeit
+import argparse
+import threading
+
+import numpy as np
+
+# Benchmark the autolab of this repository, not an installed one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import autolab
+
+
+def measure(functions: dict, number: int, repeat: int = 7) -> dict:
+    """ Returns the best time of a call to each function in µs, the
+    functions being measured in turn to share the variations of the machine """
+    times = {name: [] for name in functions}
+    for _ in range(repeat):
+        for name, function in functions.items():
+            times[name].append(timeit.timeit(function, number=number))
+    return {name: min(values) / number * 1e6 for name, values in times.items()}
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--number', type=int, default=200000,
+                        help='Calls per measure')
+    parser.add_argument('--max-overhead', type=float, default=0.1,
+                        help='Maximal time of fast_read and fast_write above a '
+                             'locked driver call in µs')
+    args = parser.parse_args(args)
+
+    device = autolab.get_device('dummy')
+    variable = device.amplitude
+    read, write = variable.read_function, variable.write_function
+    value = read()
+    lock = threading.RLock()
+
+    def locked_read():
+        with lock: return read()
+
+    def locked_write(value):
+        if isinstance(value, np.ndarray): value = np.array(value, ndmin=1)
+        else: value = float(value)
+        with lock: write(value)
+
+    results = measure({
+        ('driver', 'read'): read,
+        ('driver', 'write'): lambda: write(value),
+        ('with RLock', 'read'): locked_read,
+        ('with RLock', 'write'): lambda: locked_write(value),
+        ('__call__', 'read'): variable,
+        ('__call__', 'write'): lambda: variable(value),
+        ('fast', 'read'): variable.fast_read,
+        ('fast', 'write'): lambda: variable.fast_write(value),
+        }, args.number)
+    autolab.close()
+
+    print(f"{'':15s} {'time (µs)':>10s} {'overhead (µs)':>14s}")
+    for kind in ('read', 'write'):
+        for name in ('driver', 'with RLock', '__call__', 'fast'):
+            print(f'{name + " " + kind:15s} {results[name, kind]:10.3f} '
+                  f'{results[name, kind] - results["driver", kind]:14.3f}')
+
+    failed = False
+    for kind in ('read', 'write'):
+        above_lock = results['fast', kind] - results['with RLock', kind]
+        if above_lock > args.max_overhead:
+            print(f'fast_{kind} is {above_lock:.3f} µs slower than a locked '
+                  f'driver call (max {args.max_overhead} µs)', file=sys.stderr)
+            failed = True
+        if results['fast', kind] > results['__call__', kind]:
+            print(f'fast_{kind} is slower than __call__', file=sys.stderr)
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())